@@ -0,0 +1,61 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+# Defaults applied to every client; callers can override any of them
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_RETRIES = {
+    'max_attempts': 10,
+    'mode': 'adaptive'
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Drop clients inherited from the parent; their connections are not safe to share."""
+    global _lock
+    _clients.clear()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_client(service_name='s3', region_name=None, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+               tcp_keepalive=True, retries=None, **config_options):
+    """Return the boto3 client for this process, region and config, creating it on first use.
+
+    Each process gets its own session and clients, so nothing created before a
+    fork is reused by a Pool worker. The urllib3 connection pool holds
+    ``max_pool_connections`` keep-alive connections, which threaded callers
+    should size to at least their thread count.
+    """
+    # Config rewrites its retries dict in place, so neither the key nor the
+    # caller's (or the default) dict may be the one handed to it
+    retries = dict(retries or DEFAULT_RETRIES)
+    key = (
+        os.getpid(),
+        service_name,
+        region_name,
+        max_pool_connections,
+        tcp_keepalive,
+        repr(sorted(retries.items())),
+        repr(sorted(config_options.items())),
+    )
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                config = Config(
+                    retries=dict(retries),
+                    max_pool_connections=max_pool_connections,
+                    tcp_keepalive=tcp_keepalive,
+                    **config_options
+                )
+                client = boto3.session.Session().client(service_name, region_name=region_name, config=config)
+                _clients[key] = client
+    return client
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+# Entries are streamed to disk in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+LOCK_SUFFIX = ".lock"
+TMP_SUFFIX = ".tmp"
+# Bytes added since the last eviction, summed over every process and host
+COUNTER_NAME = "bytes-added"
+
+
+class EfsObjectCache:
+    """Content-addressed cache of S3 objects on EFS with least-recently-used eviction.
+
+    Entries are addressed by a SHA-256 of bucket, key and ETag, so an object that
+    appears in many manifests is fetched once and a changed object gets a new
+    entry. A download is guarded by an ``O_EXCL`` lock file next to the entry,
+    which lets threads and processes on any host share the cache safely: the
+    first caller downloads, the others wait for the entry to appear. The
+    downloader touches its lock while the transfer runs, so only the lock of a
+    dead worker goes stale, and each lock records its owner so a worker only
+    ever removes its own.
+
+    Every hit touches the entry's mtime. Downloaded bytes are added to a
+    counter file shared by all workers; whichever worker takes it past
+    ``max_bytes // 10`` resets it and runs ``evict()``, which deletes the
+    oldest entries until the cache is back under ``max_bytes``.
+
+    With a ``limiter``, each S3 request holds one of its slots while it runs;
+    no slot is held while waiting for another worker's download.
+    """
+
+    def __init__(self, directory, max_bytes, lock_timeout=600, poll_interval=0.2, limiter=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.limiter = limiter
+        self._bytes_added = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, bucket, key, etag):
+        digest = hashlib.sha256(f"{bucket}\0{key}\0{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    @staticmethod
+    def _touch(path):
+        """Mark an entry as recently used; returns False if it was evicted meanwhile."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _slot(self, nbytes=0):
+        return self.limiter.slot(nbytes) if self.limiter else nullcontext({})
+
+    def _try_lock(self, lock_path):
+        """Create ``lock_path`` if nobody holds it; returns the owner token, or None if it is held.
+
+        A lock whose mtime is older than ``lock_timeout`` belongs to a worker
+        that died and is removed, so the next attempt can take it.
+        """
+        token = uuid.uuid4().hex
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                    os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            return None
+        with os.fdopen(lock_fd, "w") as lock_file:
+            lock_file.write(token)
+        return token
+
+    @staticmethod
+    def _release_lock(lock_path, token):
+        """Remove ``lock_path`` only if it is still the lock taken with ``token``."""
+        try:
+            with open(lock_path, "r") as lock_file:
+                if lock_file.read() != token:
+                    return
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _download(self, s3_client, bucket, key, etag, path, lock_path):
+        """Download an entry while touching its lock, so waiters never see it go stale."""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.lock_timeout / 4):
+                self._touch(lock_path)
+
+        toucher = threading.Thread(target=heartbeat, name="efs-cache-lock-heartbeat", daemon=True)
+        toucher.start()
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}"
+        try:
+            # download_file does not accept IfMatch, so the body is streamed
+            # from a GET pinned to the ETag the entry is named after
+            with self._slot() as outcome:
+                response = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag)
+                with open(tmp_path, "wb") as f:
+                    for chunk in response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                outcome["nbytes"] = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            done.set()
+            toucher.join()
+
+    def get(self, s3_client, bucket, key):
+        """Return the local path of ``bucket/key``, downloading it only on a cache miss."""
+        with self._slot():
+            etag = s3_client.head_object(Bucket=bucket, Key=key)["ETag"]
+        path = self._entry_path(bucket, key, etag)
+        lock_path = path + LOCK_SUFFIX
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        while True:
+            if self._touch(path):
+                return path
+
+            token = self._try_lock(lock_path)
+            if token is None:
+                # Another worker is downloading this entry
+                time.sleep(self.poll_interval)
+                continue
+
+            try:
+                if self._touch(path):
+                    return path
+                self._download(s3_client, bucket, key, etag, path, lock_path)
+            finally:
+                self._release_lock(lock_path, token)
+
+            self._record_added(os.path.getsize(path))
+            return path
+
+    def _record_added(self, size):
+        """Add ``size`` to the shared counter, evicting once it passes a tenth of ``max_bytes``.
+
+        If another worker is updating the counter the bytes stay pending here
+        and are added on this process's next download.
+        """
+        with self._lock:
+            self._bytes_added += size
+
+        counter_path = os.path.join(self.directory, COUNTER_NAME)
+        lock_path = counter_path + LOCK_SUFFIX
+        token = self._try_lock(lock_path)
+        if token is None:
+            return
+        try:
+            with self._lock:
+                pending, self._bytes_added = self._bytes_added, 0
+            try:
+                with open(counter_path, "r") as counter:
+                    total = int(counter.read() or 0)
+            except (FileNotFoundError, ValueError):
+                total = 0
+            total += pending
+            should_evict = total >= self.max_bytes // 10
+
+            tmp_path = f"{counter_path}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}"
+            with open(tmp_path, "w") as counter:
+                counter.write("0" if should_evict else str(total))
+            os.replace(tmp_path, counter_path)
+        finally:
+            self._release_lock(lock_path, token)
+
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        total_bytes = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith((LOCK_SUFFIX, TMP_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by another worker
+            total_bytes -= size
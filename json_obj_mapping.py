@@ -1,8 +1,15 @@
 import os
-import fnmatch
+import json
 import hashlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+# Files are hashed in 1 MiB reads; multi-GB resources are hashed in a process pool
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+CHECKSUM_WORKERS = os.cpu_count() or 1
+# Directories being scanned at once per worker by scan_dataset_tree
+SCAN_IN_FLIGHT_PER_WORKER = 4
 
 @dataclass
 class JsonObjMapping:
@@ -24,43 +31,203 @@ def calculate_checksum(file_path: str) -> str:
     hash_sha256 = hashlib.sha256()
     try:
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            while True:
+                chunk = f.read(CHECKSUM_CHUNK_SIZE)
+                if not chunk:
+                    break
                 hash_sha256.update(chunk)
         return hash_sha256.hexdigest()
     except FileNotFoundError:
         return "File not found"
 
-def add_res_file_checksum(directory: str, json_obj_map: Dict[str, Union[JsonObjMapping, Dict[str, str]]]) -> None:
+class ChecksumCache:
+    """
+    Persistent file checksums, reused while a file's inode, size and mtime are unchanged.
+
+    Entries are kept in a JSON file keyed by path; call save() to write them back.
+    """
+
+    def __init__(self, cache_path: str):
+        """
+        :param cache_path: Path to the JSON file holding the cached checksums.
+        """
+        self.cache_path = cache_path
+        self.entries: Dict[str, Dict[str, Union[int, str]]] = {}
+        self.dirty = False
+        try:
+            with open(cache_path, "r") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"Warning: Ignoring unreadable checksum cache {cache_path}: {e}")
+
+    def merge(self, entries: Dict[str, Dict[str, Union[int, str]]]) -> None:
+        """
+        Adds entries computed elsewhere, e.g. by another process holding its own copy of the cache.
+
+        :param entries: Cache entries keyed by path.
+        """
+        for file_path, entry in entries.items():
+            if self.entries.get(file_path) != entry:
+                self.entries[file_path] = entry
+                self.dirty = True
+
+    @staticmethod
+    def _signature(st: os.stat_result) -> Dict[str, int]:
+        return {"inode": st.st_ino, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def get(self, file_path: str, st: Optional[os.stat_result] = None) -> Optional[str]:
+        """
+        Returns the cached checksum of a file, or None if it is missing or the file has changed.
+
+        :param file_path: Path to the file.
+        :param st: os.stat result for the file, if the caller already has one.
+        """
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        try:
+            st = st or os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        if any(entry.get(k) != v for k, v in self._signature(st).items()):
+            return None
+        return entry["checksum"]
+
+    def put(self, file_path: str, checksum: str, st: os.stat_result) -> None:
+        """
+        Stores a checksum together with the stat of the file it was computed from.
+
+        :param file_path: Path to the file.
+        :param checksum: Hexadecimal SHA-256 checksum string.
+        :param st: os.stat result taken before the file was hashed.
+        """
+        self.entries[file_path] = {**self._signature(st), "checksum": checksum}
+        self.dirty = True
+
+    def save(self) -> None:
+        """Writes the cache to disk if anything changed, replacing the old file atomically."""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+def checksum_files(file_paths: Iterable[str], max_workers: int = CHECKSUM_WORKERS,
+                   cache: Optional[ChecksumCache] = None) -> Dict[str, str]:
+    """
+    Calculates the SHA-256 checksums of many files, hashing uncached files in a process pool.
+
+    :param file_paths: Paths to the files.
+    :param max_workers: Number of hashing processes; 1 hashes in this process.
+    :param cache: Checksum cache to consult and update.
+    :return: Dictionary mapping each path to its checksum.
+    """
+    checksums: Dict[str, str] = {}
+    to_hash: List[Tuple[str, Optional[os.stat_result]]] = []
+    for file_path in file_paths:
+        st = None
+        if cache is not None:
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                checksums[file_path] = "File not found"
+                continue
+            cached = cache.get(file_path, st)
+            if cached is not None:
+                checksums[file_path] = cached
+                continue
+        to_hash.append((file_path, st))
+
+    paths = [file_path for file_path, _ in to_hash]
+    if max_workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            results = list(executor.map(calculate_checksum, paths))
+    else:
+        results = [calculate_checksum(file_path) for file_path in paths]
+
+    for (file_path, st), checksum in zip(to_hash, results):
+        checksums[file_path] = checksum
+        if cache is not None and checksum != "File not found":
+            cache.put(file_path, checksum, st)
+    return checksums
+
+def add_res_file_checksum(directory: str, json_obj_map: Dict[str, Union[JsonObjMapping, Dict[str, str]]],
+                          res_files: Optional[List[str]] = None,
+                          cache: Optional[ChecksumCache] = None) -> None:
     """
     Finds the .res file in the directory, calculates its checksum, and adds it to the JSON object dictionary.
 
     :param directory: Path to the directory.
     :param json_obj_map: Dictionary to store the .res file checksum under "resource".
+    :param res_files: .res file names already listed by the caller; the directory is listed if omitted.
+    :param cache: Checksum cache; an unchanged .res file is not hashed again.
     """
-    files = [file for file in os.listdir(directory) if file.endswith(".res")]
+    if res_files is None:
+        res_files = [file for file in os.listdir(directory) if file.endswith(".res")]
+    files = res_files
 
     if len(files) == 1:
         res_file = files[0]
         res_path = os.path.join(directory, res_file)
-        checksum = calculate_checksum(res_path)
+        if cache is not None:
+            checksum = checksum_files([res_path], max_workers=1, cache=cache)[res_path]
+        else:
+            checksum = calculate_checksum(res_path)
 
         # Add .res file checksum under a "resource" key in json_obj_map
         json_obj_map["resource"] = {res_file: checksum}
     elif len(files) > 1:
         print("Warning: More than one .res file found. Skipping checksum calculation.")
 
-# Existing function (unchanged)
-def match_json_obj_files(directory: str) -> Dict[str, Union[JsonObjMapping, Dict[str, str]]]:
+def index_directory(directory: str,
+                    subdirs: Optional[List[str]] = None) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+    """
+    Lists a directory once and indexes its JSON, OBJ and .res files.
+
+    An OBJ file matches the pattern "<base>.*.obj" for every base name that ends
+    just before one of its dots (leaving at least ".obj" after it), so it is
+    filed under each of those base names in a hash index.
+
+    :param directory: Path to the directory containing JSON and OBJ files.
+    :param subdirs: If given, the names of subdirectories (not followed through symlinks) are appended to it.
+    :return: JSON file names, OBJ file names grouped by base name, and .res file names.
+    """
+    json_files: List[str] = []
+    objs_by_base: Dict[str, List[str]] = {}
+    res_files: List[str] = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith(".json"):
+                json_files.append(name)
+            elif name.endswith(".res"):
+                res_files.append(name)
+
+            if name.endswith(".obj"):
+                dot = name.find(".")
+                while 0 <= dot <= len(name) - 5:
+                    objs_by_base.setdefault(name[:dot], []).append(name)
+                    dot = name.find(".", dot + 1)
+            elif subdirs is not None and entry.is_dir(follow_symlinks=False):
+                subdirs.append(name)
+
+    return json_files, objs_by_base, res_files
+
+def match_json_obj_files(directory: str,
+                         cache: Optional[ChecksumCache] = None) -> Dict[str, Union[JsonObjMapping, Dict[str, str]]]:
     """
     Identifies JSON files and matches corresponding .obj files.
 
     :param directory: Path to the directory containing JSON and OBJ files.
+    :param cache: Checksum cache used for the .res file.
     :return: Dictionary where JSON filenames are keys, and JsonObjMapping objects as values.
     """
-    files = os.listdir(directory)
-
-    # Identify all JSON files
-    json_files = [file for file in files if file.endswith(".json")]
+    json_files, objs_by_base, res_files = index_directory(directory)
 
     # Create a mapping dictionary
     json_obj_map: Dict[str, Union[JsonObjMapping, Dict[str, str]]] = {}
@@ -68,30 +235,131 @@ def match_json_obj_files(directory: str) -> Dict[str, Union[JsonObjMapping, Dict
     for json_file in json_files:
         base_name = os.path.splitext(json_file)[0]  # Extract base name without extension
 
-        # Find matching .obj files
-        matching_objs = sorted(
-            [file for file in files if fnmatch.fnmatch(file, f"{base_name}.*.obj")]
-        )
+        # Look up matching .obj files in the index
+        matching_objs = sorted(objs_by_base.get(base_name, []))
 
         # Store in dataclass and add to dictionary
         json_obj_map[json_file] = JsonObjMapping(json_file=json_file, obj_files=matching_objs)
 
     # Add .res file checksum to the dictionary
-    add_res_file_checksum(directory, json_obj_map)
+    add_res_file_checksum(directory, json_obj_map, res_files, cache)
 
     return json_obj_map
 
-# Example usage:
-directory = "/path/to/your/directory"
-result = match_json_obj_files(directory)
+_scan_cache: Optional[ChecksumCache] = None
+
+def _init_scan_worker(cache_path: Optional[str]) -> None:
+    """Loads the checksum cache once per scan worker process."""
+    global _scan_cache
+    _scan_cache = ChecksumCache(cache_path) if cache_path else None
+
+def scan_directory(directory: str) -> Tuple[Optional[Dict[str, Any]], List[str], Dict[str, Dict[str, Union[int, str]]]]:
+    """
+    Builds the NDJSON record for one dataset directory.
+
+    The record holds the JSON to OBJ mapping and the checksum of every .res
+    file in the directory. Runs in a scan worker, which only reads its copy of
+    the checksum cache; the entries it used are returned for the caller to merge.
+
+    :param directory: Path to the directory.
+    :return: The record (None if the directory could not be read), subdirectory paths, and checksum cache entries.
+    """
+    subdirs: List[str] = []
+    try:
+        json_files, objs_by_base, res_files = index_directory(directory, subdirs)
+    except OSError as e:
+        print(f"Error scanning {directory}: {e}")
+        return None, [], {}
+
+    mappings = {
+        json_file: sorted(objs_by_base.get(os.path.splitext(json_file)[0], []))
+        for json_file in sorted(json_files)
+    }
+    res_paths = [os.path.join(directory, res_file) for res_file in sorted(res_files)]
+    checksums = checksum_files(res_paths, max_workers=1, cache=_scan_cache)
+    resources = {os.path.basename(res_path): checksums[res_path] for res_path in res_paths}
+
+    cache_entries = {}
+    if _scan_cache is not None:
+        cache_entries = {res_path: _scan_cache.entries[res_path] for res_path in res_paths if res_path in _scan_cache.entries}
+
+    record = {"directory": directory, "mappings": mappings, "resources": resources}
+    return record, [os.path.join(directory, name) for name in subdirs], cache_entries
 
-# Print JSON-OBJ mapping and .res checksum
-for key, value in result.items():
-    if isinstance(value, JsonObjMapping):
-        print(f"{value.json_file}: {value.obj_files} (Count: {value.obj_count()})")
-    elif key == "resource":
-        res_file, checksum = list(value.items())[0]
-        print(f"Resource -> {res_file}: Checksum -> {checksum}")
+def iter_dataset_records(root: str, max_workers: int = CHECKSUM_WORKERS,
+                         max_in_flight: Optional[int] = None,
+                         cache_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Recursively scans a dataset tree in a process pool, yielding one record per directory as it completes.
+
+    Records come out in completion order, not tree order. At most
+    ``max_in_flight`` directories are being scanned at once; the remaining
+    subdirectories wait as paths, walked depth-first to keep that list short.
+
+    :param root: Top directory of the dataset tree.
+    :param max_workers: Number of scanning processes.
+    :param max_in_flight: Directories submitted to the pool at once; defaults to SCAN_IN_FLIGHT_PER_WORKER per worker.
+    :param cache_path: Checksum cache file; workers read it and it is updated once the scan finishes.
+    :return: Iterator of {"directory", "mappings", "resources"} records.
+    """
+    max_in_flight = max_in_flight or max_workers * SCAN_IN_FLIGHT_PER_WORKER
+    cache = ChecksumCache(cache_path) if cache_path else None
+    pending = [root]
+    in_flight = set()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_scan_worker,
+                             initargs=(cache_path,)) as executor:
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < max_in_flight:
+                    in_flight.add(executor.submit(scan_directory, pending.pop()))
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record, subdirs, cache_entries = future.result()
+                    pending.extend(reversed(subdirs))
+                    if cache is not None:
+                        cache.merge(cache_entries)
+                    if record is not None:
+                        yield record
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if cache is not None:
+                cache.save()
+
+def scan_dataset_tree(root: str, output: TextIO, **kwargs) -> int:
+    """
+    Writes one NDJSON line per dataset directory under root, flushing after each line.
+
+    :param root: Top directory of the dataset tree.
+    :param output: Text stream the records are written to.
+    :param kwargs: Passed on to iter_dataset_records.
+    :return: Number of records written.
+    """
+    count = 0
+    for record in iter_dataset_records(root, **kwargs):
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        count += 1
+    return count
+
+if __name__ == "__main__":
+    # Example usage:
+    directory = "/path/to/your/directory"
+    result = match_json_obj_files(directory)
+
+    # Print JSON-OBJ mapping and .res checksum
+    for key, value in result.items():
+        if isinstance(value, JsonObjMapping):
+            print(f"{value.json_file}: {value.obj_files} (Count: {value.obj_count()})")
+        elif key == "resource":
+            res_file, checksum = list(value.items())[0]
+            print(f"Resource -> {res_file}: Checksum -> {checksum}")
+
+    # Recursive mode: one NDJSON record per dataset directory
+    with open("dataset_index.ndjson", "w") as output:
+        scan_dataset_tree(directory, output, cache_path="checksum_cache.json")
 
 
 
@@ -104,7 +372,7 @@ x.json: [] (Count: 0)
 
 Resource -> dataset.res: Checksum -> 5f3665a1c1e23e9fdfb8300adbbce472c1b8e3d1bbf1a2...
 
-""
+"""
 
 """
 output: json :
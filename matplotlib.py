@@ -1,26 +1,118 @@
 import os
+import json
+import time
 import pandas as pd
 import matplotlib.pyplot as plt
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Set your base directory
 base_dir = '/path/to/root/directory'
 
-# Dictionary to store counts of documents
-data = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+# Year/month subtrees are counted on this many threads
+max_workers = 32
 
-# Walk through the directory structure
-for root, dirs, files in os.walk(base_dir):
-    # Expecting the structure: /a/year/month/date/parent/child/uuid
-    parts = root.split(os.sep)
-    
-    if len(parts) >= 6:  # Ensure it's deep enough in the directory structure
-        year = parts[-5]    # Extract year
-        month = parts[-4]   # Extract month
-        parent = parts[-2]  # Extract parent category
-        
-        # Count the entries for each parent by year and month
-        data[parent][year][month] += len(files)
+# Per-directory counts from the last run, reused while the directory's mtime is unchanged
+cache_file = 'document_counts_cache.json'
+
+# A directory modified this close to its scan may change again without its
+# mtime moving (NFS timestamps are coarse), so its count is never reused
+cache_settle_seconds = 2
+
+
+def scan_directory(path, cache):
+    """Return the cache entry (subdirectories and file count) for one directory, listing it only if its mtime changed.
+
+    Entries that are not directories are counted as files, like os.walk does;
+    symlinked directories are not followed. A directory modified within
+    ``cache_settle_seconds`` of the scan gets no mtime in its entry, so the
+    next run lists it again.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    entry = cache.get(path)
+    if entry is not None and entry['mtime_ns'] == mtime_ns:
+        return entry
+
+    subdirs = []
+    files = 0
+    with os.scandir(path) as entries:
+        for dir_entry in entries:
+            if not dir_entry.is_dir():
+                files += 1
+            elif not dir_entry.is_symlink():
+                subdirs.append(dir_entry.name)
+    if time.time_ns() - mtime_ns < cache_settle_seconds * 10 ** 9:
+        mtime_ns = None
+    return {'mtime_ns': mtime_ns, 'subdirs': subdirs, 'files': files}
+
+
+def count_subtree(top, cache, max_depth=None):
+    """Count the documents under ``top`` by (parent, year, month).
+
+    Directories ``max_depth`` levels below ``top`` are returned unscanned so
+    they can be counted elsewhere. Returns the counts, the cache entries of
+    every directory scanned, and those unscanned directories.
+    """
+    counts = defaultdict(int)
+    seen = {}
+    frontier = []
+    stack = [(top, 0)]
+    while stack:
+        path, depth = stack.pop()
+        if depth == max_depth:
+            frontier.append(path)
+            continue
+        try:
+            entry = scan_directory(path, cache)
+        except OSError as e:
+            print(f"Error scanning {path}: {e}")
+            continue
+        seen[path] = entry
+
+        # Expecting the structure: /a/year/month/date/parent/child/uuid
+        parts = path.split(os.sep)
+        if len(parts) >= 6:  # Ensure it's deep enough in the directory structure
+            year = parts[-5]    # Extract year
+            month = parts[-4]   # Extract month
+            parent = parts[-2]  # Extract parent category
+
+            # Count the entries for each parent by year and month
+            counts[(parent, year, month)] += entry['files']
+
+        stack.extend((os.path.join(path, name), depth + 1) for name in entry['subdirs'])
+    return counts, seen, frontier
+
+
+def count_documents(base_dir, max_workers=max_workers, cache_file=cache_file):
+    """Count documents per parent, year and month, counting each year/month subtree on its own thread."""
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    # The base and year directories are scanned here to find the month subtrees
+    totals, seen, month_dirs = count_subtree(base_dir, cache, max_depth=2)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for counts, subtree_seen, _ in executor.map(lambda top: count_subtree(top, cache), month_dirs):
+            for key, count in counts.items():
+                totals[key] += count
+            seen.update(subtree_seen)
+
+    # Only directories that still exist are kept in the cache
+    if seen != cache:
+        with open(cache_file + '.tmp', 'w') as f:
+            json.dump(seen, f)
+        os.replace(cache_file + '.tmp', cache_file)
+
+    data = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for (parent, year, month), count in totals.items():
+        data[parent][year][month] += count
+    return data
+
+
+# Dictionary to store counts of documents
+data = count_documents(base_dir)
 
 # Convert the data into a DataFrame for plotting
 records = []
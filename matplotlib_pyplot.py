@@ -1,30 +1,36 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import re
 
 # Read the data from a CSV file that contains paths
 csv_file = '/path/to/your/data.csv'
-df = pd.read_csv(csv_file)
 
-# Define a function to extract year, month, and parent from the path
-def extract_info_from_path(path):
-    parts = path.split(os.sep)  # Split by the file separator
-    if len(parts) >= 6:  # Ensure path is long enough
-        year = parts[-5]
-        month = parts[-4]
-        parent = parts[-2]
-        return parent, year, month
-    return None, None, None
+# Rows read and aggregated at a time; peak memory is bounded by this, not by the file size
+chunk_size = 1_000_000
 
-# Create new columns for Parent, Year, and Month
-df[['Parent', 'Year', 'Month']] = df.apply(lambda row: pd.Series(extract_info_from_path(row['Path'])), axis=1)
+# Paths look like .../year/month/date/parent/child: parent is the second-to-last
+# component, year and month the fifth- and fourth-to-last
+sep = re.escape(os.sep)
+part = f'[^{sep}]*'
+path_pattern = (
+    f'^(?:.*{sep})?{part}{sep}(?P<Year>{part}){sep}(?P<Month>{part}){sep}'
+    f'{part}{sep}(?P<Parent>{part}){sep}{part}$'
+)
 
-# Drop rows with invalid paths
-df = df.dropna(subset=['Parent', 'Year', 'Month'])
+# Count the number of entries for each Parent, Year, and Month, one chunk at a time
+chunk_counts = []
+for chunk in pd.read_csv(csv_file, usecols=['Path'], dtype={'Path': str}, chunksize=chunk_size):
+    # Extract Parent, Year and Month for the whole chunk; rows with paths too short to match become NaN
+    info = chunk['Path'].str.extract(path_pattern).dropna()
+    chunk_counts.append(info.groupby(['Parent', 'Year', 'Month']).size())
 
-# Count the number of entries for each Parent, Year, and Month
-df['Count'] = 1  # Add a count column
-df_grouped = df.groupby(['Parent', 'Year', 'Month']).size().reset_index(name='Count')
+df_grouped = (
+    pd.concat(chunk_counts)
+    .groupby(level=['Parent', 'Year', 'Month'])
+    .sum()
+    .reset_index(name='Count')
+)
 
 # Plotting the data for each parent
 for parent in df_grouped['Parent'].unique():
@@ -1,56 +1,191 @@
-import boto3
 import multiprocessing
+import multiprocessing.connection
+import signal
+import threading
 import time
+from aws_clients import get_client
+from sqs_ack_manager import SqsAckManager
 
 # Configure SQS
-sqs_client = boto3.client('sqs')
 queue_url = 'https://sqs.us-east-1.amazonaws.com/123456789012/MyQueue'
 max_processes = 5
-processes = []
+# Messages received ahead of the workers; the poller blocks once this many are waiting
+prefetch_size = max_processes * 2
+# In-flight messages are kept invisible for visibility_timeout seconds, renewed every heartbeat_interval
+visibility_timeout = 60
+heartbeat_interval = 20
+# A failed message is retried after retry_backoff seconds, doubling per receive up to max_retry_backoff
+retry_backoff = 30
+max_retry_backoff = 900
+# How often the drain thread checks that every worker is still alive
+monitor_interval = 1.0
+# Replacement workers are started while the drain and heartbeat threads run, so
+# they come from a single-threaded fork server rather than a fork of this process
+mp_context = multiprocessing.get_context('forkserver')
+
+
+def sqs_client():
+    """SQS client, created once per process."""
+    return get_client('sqs')
+
 
 def process_message(message):
+    """Process one message; the poller deletes it in a batch if this returns True."""
     try:
         print(f"Processing Message: {message['Body']} in PID {multiprocessing.current_process().pid}")
         time.sleep(2)  # Simulate processing time
-
-        # Delete the message from the queue once processed
-        sqs_client.delete_message(QueueUrl=queue_url, ReceiptHandle=message['ReceiptHandle'])
-        print(f"Deleted message with ReceiptHandle: {message['ReceiptHandle']}")
+        return True
     except Exception as e:
         print(f"Error processing message: {e}")
+        return False
 
-def poll_and_process():
+
+def worker(task_queue, results):
+    """Long-lived worker that processes messages until it receives the None sentinel.
+
+    Each message is reported on this worker's own pipe when it starts and
+    when it is done, so the poller knows what to give back to SQS if the
+    process dies; a dead worker can only break its own pipe.
+    """
+    # Ctrl-C is handled by the poller, which drains the queue and sends the sentinels
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
     while True:
-        # Clean up finished processes
-        for p in processes[:]:
-            if not p.is_alive():
-                p.join()
-                processes.remove(p)
-
-        # Control the number of processes
-        if len(processes) >= max_processes:
-            time.sleep(1)
-            continue
-
-        # Poll message from SQS
-        response = sqs_client.receive_message(
-            QueueUrl=queue_url,
-            MaxNumberOfMessages=1,
-            WaitTimeSeconds=5
-        )
-
-        messages = response.get('Messages', [])
-        if not messages:
-            print("No messages found. Waiting...")
-            continue
-
-        message = messages[0]
-        print("Received message. Starting process.")
-
-        # Start a new process for the message
-        p = multiprocessing.Process(target=process_message, args=(message,))
+        message = task_queue.get()
+        if message is None:
+            break
+        results.send(('start', message['ReceiptHandle']))
+        results.send(('done', message['ReceiptHandle'], process_message(message)))
+
+
+class WorkerPool:
+    """The worker processes keyed by their result pipes; dead workers are replaced until stop() is called."""
+
+    def __init__(self, task_queue, size):
+        self.task_queue = task_queue
+        self.workers = {}
+        self.stopping = False
+        self.lock = threading.Lock()
+        for _ in range(size):
+            self._start_worker()
+
+    def _start_worker(self):
+        reader, writer = mp_context.Pipe(duplex=False)
+        p = mp_context.Process(target=worker, args=(self.task_queue, writer))
         p.start()
-        processes.append(p)
+        # Only the worker holds the write end, so the reader sees EOF once it exits
+        writer.close()
+        self.workers[reader] = p
+
+    def remove(self, reader):
+        """Forget an exited worker, starting a replacement unless the pool is stopping."""
+        with self.lock:
+            p = self.workers.pop(reader)
+            if not self.stopping:
+                print(f"Worker {p.pid} exited unexpectedly; starting a replacement")
+                self._start_worker()
+        p.join()
+        reader.close()
+
+    def stop(self):
+        """Send one sentinel per worker and wait for them to exit."""
+        with self.lock:
+            self.stopping = True
+            processes = list(self.workers.values())
+        for _ in processes:
+            self.task_queue.put(None)
+        for p in processes:
+            p.join()
+
+
+def drain_results(pool, ack_manager):
+    """Hand worker results to the ack manager until every worker has exited after pool.stop().
+
+    When a worker dies, whatever it reported before dying is applied first,
+    then the message it was still working on is nacked and the worker is
+    replaced.
+    """
+    current = {}  # result pipe -> receipt handle its worker is working on
+
+    def exited(reader):
+        pool.remove(reader)
+        receipt_handle = current.pop(reader, None)
+        if receipt_handle is not None:
+            print("A worker died while processing a message; releasing it")
+            ack_manager.nack(receipt_handle)
+
+    while True:
+        with pool.lock:
+            workers = dict(pool.workers)
+        if not workers:
+            return
+
+        for reader in multiprocessing.connection.wait(list(workers), timeout=monitor_interval):
+            try:
+                result = reader.recv()
+            except EOFError:
+                exited(reader)
+                continue
+            if result[0] == 'start':
+                current[reader] = result[1]
+                continue
+            _, receipt_handle, succeeded = result
+            current.pop(reader, None)
+            if succeeded:
+                ack_manager.ack(receipt_handle)
+            else:
+                ack_manager.nack(receipt_handle)
+
+        # A worker that died while something else still holds its pipe never sends EOF
+        for reader, p in workers.items():
+            if reader in pool.workers and not p.is_alive() and not reader.poll():
+                exited(reader)
+
+
+def poll_and_process():
+    task_queue = mp_context.Queue(maxsize=prefetch_size)
+    pool = WorkerPool(task_queue, max_processes)
+
+    # Deletes are batched and in-flight messages heartbeated from this process
+    ack_manager = SqsAckManager(
+        sqs_client(),
+        queue_url,
+        visibility_timeout=visibility_timeout,
+        heartbeat_interval=heartbeat_interval,
+        retry_backoff=retry_backoff,
+        max_retry_backoff=max_retry_backoff
+    )
+    ack_manager.start()
+    drainer = threading.Thread(target=drain_results, args=(pool, ack_manager), daemon=True)
+    drainer.start()
+
+    try:
+        while True:
+            # Long-poll for up to 10 messages at a time
+            response = sqs_client().receive_message(
+                QueueUrl=queue_url,
+                MaxNumberOfMessages=10,
+                WaitTimeSeconds=20,
+                AttributeNames=['ApproximateReceiveCount']
+            )
+
+            messages = response.get('Messages', [])
+            if not messages:
+                print("No messages found. Waiting...")
+                continue
+
+            print(f"Received {len(messages)} messages.")
+            for message in messages:
+                receive_count = int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1))
+                ack_manager.track(message['ReceiptHandle'], receive_count)
+                task_queue.put(message)  # Blocks while the workers are prefetch_size behind
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+    finally:
+        # Sentinels to signal the workers to exit
+        pool.stop()
+        drainer.join()
+        ack_manager.close()
+
 
 if __name__ == "__main__":
-    poll_and_process()
\ No newline at end of file
+    poll_and_process()
@@ -0,0 +1,109 @@
+import glob
+import os
+import socket
+import threading
+import time
+
+MANIFEST = "M"
+OBJECT = "B"
+
+
+class ProgressStore:
+    """Durable record of finished manifests and Bucket B keys, kept as append-only logs.
+
+    Every process appends to its own log file under ``directory`` so concurrent
+    writers never interleave on EFS. On start-up all logs are replayed; a line
+    cut short by a crash has no trailing newline and is ignored.
+
+    Object records are buffered and written ``batch_size`` at a time, once
+    ``flush_interval`` seconds have passed, or on flush(); a crash loses at
+    most those unwritten records, whose objects are simply fetched again.
+    Manifest records are written straight away, after any buffered objects.
+    """
+
+    def __init__(self, directory, batch_size=1000, flush_interval=5.0):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self.completed_manifests = set()
+        self.completed_objects = set()
+        self._log = None
+        self._log_pid = None
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._load()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_log"] = None
+        state["_log_pid"] = None
+        state["_pending"] = []
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        for path in glob.glob(os.path.join(self.directory, "*.log")):
+            with open(path, "r") as log:
+                for line in log:
+                    if not line.endswith("\n"):
+                        break
+                    kind, _, key = line[:-1].partition("\t")
+                    if kind == MANIFEST:
+                        self.completed_manifests.add(key)
+                    elif kind == OBJECT:
+                        self.completed_objects.add(key)
+
+    def _append(self, kind, key, flush=False):
+        with self._lock:
+            # Reopen after a fork so each process writes to a log of its own;
+            # records buffered by the parent are left for the parent to write
+            if self._log is None or self._log_pid != os.getpid():
+                self._log_pid = os.getpid()
+                self._pending = []
+                log_name = f"{socket.gethostname()}-{self._log_pid}.log"
+                self._log = open(os.path.join(self.directory, log_name), "a")
+            self._pending.append(f"{kind}\t{key}\n")
+            if (flush or len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._write_pending()
+
+    def _write_pending(self):
+        if self._pending:
+            self._log.write("".join(self._pending))
+            self._log.flush()
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write any buffered object records to this process's log."""
+        with self._lock:
+            if self._log is not None and self._log_pid == os.getpid():
+                self._write_pending()
+
+    def is_manifest_done(self, file_key):
+        return file_key in self.completed_manifests
+
+    def is_object_done(self, object_key):
+        return object_key in self.completed_objects
+
+    def mark_manifest_done(self, file_key):
+        self._append(MANIFEST, file_key, flush=True)
+        self.completed_manifests.add(file_key)
+
+    def mark_object_done(self, object_key):
+        self._append(OBJECT, object_key)
+        self.completed_objects.add(object_key)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None and self._log_pid == os.getpid():
+                self._write_pending()
+                os.fsync(self._log.fileno())
+                self._log.close()
+            self._log = None
@@ -0,0 +1,101 @@
+import csv
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+RECON_HEADER = ["FileName", "TotalLines", "SuccessfulDownloads"]
+
+
+class ReconciliationSink:
+    """Single writer for reconciliation rows produced by many worker processes.
+
+    Workers put ``(file_key, total_lines, successful_downloads, completed)``
+    tuples on ``self.queue``. A thread in the parent drains the queue and
+    appends rows to ``path`` in batches, flushing when ``batch_size`` rows are
+    pending or ``flush_interval`` seconds have passed. Once a batch is on disk,
+    ``on_complete`` is called with the key of every row marked ``completed``.
+
+    If writing a row or ``on_complete`` fails, the error is kept and the
+    thread goes on draining the queue, dropping rows, so workers putting rows
+    never block; close() then raises the error.
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=5.0, on_complete=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_complete = on_complete
+        self.queue = multiprocessing.Queue()
+        self.error = None
+        self._thread = None
+        self._stopped = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="reconciliation-sink", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush every queued row and stop the writer thread, raising any error the writer hit."""
+        if self._thread is not None:
+            self.queue.put(None)  # Sentinel to signal the writer to exit
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            self._write_rows()
+        except Exception as e:
+            self.error = e
+            print(f"Reconciliation writer failed, dropping further rows: {e}")
+            # Keep draining so workers blocked on the queue can still exit
+            while not self._stopped:
+                self._stopped = self.queue.get() is None
+
+    def _write_rows(self):
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as recon:
+            writer = csv.writer(recon, lineterminator="\n")
+            if write_header:
+                writer.writerow(RECON_HEADER)
+                recon.flush()
+
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    row = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    row = ()
+
+                if row is None:
+                    self._stopped = True
+                    self._flush(recon, writer, batch)
+                    os.fsync(recon.fileno())
+                    break
+                if row:
+                    batch.append(row)
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush(recon, writer, batch)
+                    batch = []
+                    deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, recon, writer, batch):
+        if not batch:
+            return
+        writer.writerows(row[:3] for row in batch)
+        recon.flush()
+        if self.on_complete is not None:
+            for file_key, _, _, completed in batch:
+                if completed:
+                    self.on_complete(file_key)
@@ -1,11 +1,48 @@
-import boto3
 import os
+import threading
+import time
+from aws_clients import get_client
 from botocore.exceptions import ClientError
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from efs_object_cache import EfsObjectCache
 from multiprocessing import Pool
+from progress_store import ProgressStore
+from reconciliation_sink import ReconciliationSink
+from s3_concurrency import AdaptiveConcurrencyLimiter
+from s3_listing import bounded, list_objects_parallel
+
+# Number of threads used to download the Bucket B objects listed in one manifest
+BUCKET_B_DOWNLOAD_THREADS = 16
+
+# Number of Bucket C files handed to the worker pool ahead of their results
+MAX_IN_FLIGHT_FILES = (os.cpu_count() or 1) * 4
+
+# Bucket C is listed as LIST_WORKERS key ranges at once, split at the prefixes
+# LIST_PREFIX_DEPTH levels down or at LIST_SPLIT_KEYS when set
+LIST_WORKERS = 16
+LIST_PREFIX_DEPTH = 1
+LIST_SPLIT_KEYS = None
+
+# Keep-alive connections per client; the Bucket B download threads and the
+# transfer threads of each download_file call share this pool
+S3_MAX_POOL_CONNECTIONS = BUCKET_B_DOWNLOAD_THREADS * 4
+
+# In-flight S3 requests are capped by an AIMD limit shared with the pool workers.
+# It starts at one slot per transfer thread across all workers, so S3 throttling
+# is the only thing that lowers concurrency below what the pool can run.
+S3_MAX_CONCURRENCY = (os.cpu_count() or 1) * (BUCKET_B_DOWNLOAD_THREADS + 1)
+s3_limiter = AdaptiveConcurrencyLimiter(initial=S3_MAX_CONCURRENCY, maximum=S3_MAX_CONCURRENCY)
+
+
+def s3_client_c():
+    """S3 client for Bucket C (east-2), created once per process."""
+    return get_client('s3', region_name='us-east-2', max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+
+
+def s3_client_ab():
+    """S3 client for Buckets A and B (east-1), created once per process."""
+    return get_client('s3', region_name='us-east-1', max_pool_connections=S3_MAX_POOL_CONNECTIONS)
 
-# S3 Clients for different regions
-s3_client_c = boto3.client('s3', region_name='us-east-2')
-s3_client_ab = boto3.client('s3', region_name='us-east-1')
 
 # Buckets
 BUCKET_C = "bucket-c-east-2"
@@ -15,13 +52,33 @@ BUCKET_A = "bucket-a-east-1"
 # EFS Directory
 EFS_DIRECTORY = "/mnt/efs"
 RECON_FILE = os.path.join(EFS_DIRECTORY, "reconciliation.csv")
+PROGRESS_DIRECTORY = os.path.join(EFS_DIRECTORY, "progress")
+
+# Bucket B objects are cached by bucket/key/ETag and evicted least-recently-used
+OBJECT_CACHE_DIRECTORY = os.path.join(EFS_DIRECTORY, "object-cache")
+OBJECT_CACHE_MAX_BYTES = 500 * 1024 ** 3
+object_cache = EfsObjectCache(OBJECT_CACHE_DIRECTORY, OBJECT_CACHE_MAX_BYTES, limiter=s3_limiter)
+
+# Reconciliation rows are batched by a single writer in the parent process.
+# With RECON_SHARD_PER_RUN each run writes its own reconciliation-<run id>.csv.
+RECON_BATCH_SIZE = 1000
+RECON_FLUSH_INTERVAL = 5.0
+RECON_SHARD_PER_RUN = False
+
+# Checkpoint of finished manifests and Bucket B keys, installed in each pool worker by main()
+progress_store = None
+
+# Queue feeding the reconciliation writer, installed in each pool worker by main()
+recon_queue = None
 
 
 def download_file_from_bucket_c(file_key):
     """Download a file from Bucket C (east-2)."""
     local_file_path = os.path.join(EFS_DIRECTORY, file_key.replace("/", "_"))
     try:
-        s3_client_c.download_file(BUCKET_C, file_key, local_file_path)
+        with s3_limiter.slot() as outcome:
+            s3_client_c().download_file(BUCKET_C, file_key, local_file_path)
+            outcome['nbytes'] = os.path.getsize(local_file_path)
         return local_file_path
     except ClientError as e:
         print(f"Failed to download {file_key} from Bucket C: {e}")
@@ -29,16 +86,69 @@ def download_file_from_bucket_c(file_key):
 
 
 def download_object_from_bucket_b(object_key):
-    """Download an object from Bucket B (east-1) to EFS."""
-    local_file_path = os.path.join(EFS_DIRECTORY, object_key.replace("/", "_"))
+    """Download an object from Bucket B (east-1) into the EFS object cache.
+
+    The cache holds a limiter slot for each S3 request it makes, not while it
+    waits for another worker to finish downloading the same object.
+    """
     try:
-        s3_client_ab.download_file(BUCKET_B, object_key, local_file_path)
-        return local_file_path
+        return object_cache.get(s3_client_ab(), BUCKET_B, object_key)
     except ClientError as e:
         print(f"Failed to download {object_key} from Bucket B: {e}")
         return None
 
 
+def _download_object_safely(object_key):
+    """Download one Bucket B object, reporting any unexpected error against its key."""
+    try:
+        local_file_path = download_object_from_bucket_b(object_key)
+    except Exception as e:
+        print(f"Failed to download {object_key} from Bucket B: {e}")
+        return None
+    if local_file_path and progress_store is not None:
+        progress_store.mark_object_done(object_key)
+    return local_file_path
+
+
+def download_objects_from_bucket_b(object_keys, max_workers=BUCKET_B_DOWNLOAD_THREADS):
+    """Download Bucket B objects on a bounded thread pool.
+
+    At most ``2 * max_workers`` downloads are queued at once, so a manifest with
+    tens of thousands of keys never materialises that many futures. Keys the
+    progress store already records as downloaded count as successful and are
+    not fetched again.
+    Returns the number of successful downloads and the list of keys that failed.
+    """
+    successful_downloads = 0
+    failed_keys = []
+    max_workers = max(1, max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+        for object_key in object_keys:
+            if progress_store is not None and progress_store.is_object_done(object_key):
+                successful_downloads += 1
+                continue
+            in_flight[executor.submit(_download_object_safely, object_key)] = object_key
+            if len(in_flight) < 2 * max_workers:
+                continue
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    successful_downloads += 1
+                else:
+                    failed_keys.append(in_flight[future])
+                del in_flight[future]
+
+        for future, object_key in in_flight.items():
+            if future.result():
+                successful_downloads += 1
+            else:
+                failed_keys.append(object_key)
+
+    return successful_downloads, failed_keys
+
+
 def process_file_from_bucket_c(file_key):
     """Process a file from Bucket C, download objects from Bucket B, and upload the original file to Bucket A."""
     # Step 1: Download the file from Bucket C
@@ -51,18 +161,21 @@ def process_file_from_bucket_c(file_key):
         object_keys = f.read().splitlines()
 
     total_lines = len(object_keys)
-    successful_downloads = 0
 
-    # Step 3: Download objects from Bucket B sequentially (no multiprocessing here)
-    for object_key in object_keys:
-        if download_object_from_bucket_b(object_key):
-            successful_downloads += 1
+    # Step 3: Download objects from Bucket B concurrently on a bounded thread pool
+    successful_downloads, failed_keys = download_objects_from_bucket_b(object_keys)
+    if failed_keys:
+        print(f"{file_key}: {len(failed_keys)} of {total_lines} Bucket B objects failed to download")
+    if progress_store is not None:
+        progress_store.flush()
 
     # Step 4: Upload the original file from Bucket C to Bucket A
-    upload_file_to_bucket_a(local_file_path, file_key)
+    uploaded = upload_file_to_bucket_a(local_file_path, file_key)
 
-    # Step 5: Write reconciliation information
-    write_reconciliation(file_key, total_lines, successful_downloads)
+    # Step 5: Write reconciliation information; a manifest that was uploaded with
+    # every object downloaded is checkpointed once its row is on disk, so a
+    # restarted run skips it and retries only manifests with failed keys
+    write_reconciliation(file_key, total_lines, successful_downloads, completed=uploaded and not failed_keys)
 
     return file_key
 
@@ -70,64 +183,89 @@ def process_file_from_bucket_c(file_key):
 def upload_file_to_bucket_a(local_file_path, s3_key):
     """Upload a file to Bucket A (east-1)."""
     try:
-        s3_client_ab.upload_file(local_file_path, BUCKET_A, s3_key)
+        with s3_limiter.slot(os.path.getsize(local_file_path)):
+            s3_client_ab().upload_file(local_file_path, BUCKET_A, s3_key)
         print(f"Uploaded to A: {s3_key}")
+        return True
     except ClientError as e:
         print(f"Failed to upload {s3_key} to Bucket A: {e}")
+        return False
+
 
+def write_reconciliation(file_key, total_lines, successful_downloads, completed=False):
+    """Send reconciliation information to the recon writer, or append it to the recon file directly."""
+    if recon_queue is not None:
+        recon_queue.put((file_key, total_lines, successful_downloads, completed))
+        return
 
-def write_reconciliation(file_key, total_lines, successful_downloads):
-    """Write reconciliation information to the recon file."""
     with open(RECON_FILE, "a") as recon:
         recon.write(f"{file_key},{total_lines},{successful_downloads}\n")
+    if completed and progress_store is not None:
+        progress_store.mark_manifest_done(file_key)
 
-"""
-def main():
-    """Main function to process files from Bucket C."""
-    # Create EFS directory if not exists
-    os.makedirs(EFS_DIRECTORY, exist_ok=True)
 
-    # Setup reconciliation file
-    if not os.path.exists(RECON_FILE):
-        with open(RECON_FILE, "w") as recon:
-            recon.write("FileName,TotalLines,SuccessfulDownloads\n")
+def iter_bucket_c_keys():
+    """Yield every file key in Bucket C from parallel key-range listings."""
+    objects = list_objects_parallel(
+        s3_client_c(),
+        BUCKET_C,
+        split_keys=LIST_SPLIT_KEYS,
+        depth=LIST_PREFIX_DEPTH,
+        max_workers=LIST_WORKERS
+    )
+    for obj in objects:
+        yield obj['Key']
 
-    # Paginate through Bucket C to get all files
-    paginator = s3_client_c.get_paginator('list_objects_v2')
-    file_keys = []
 
-    for page in paginator.paginate(Bucket=BUCKET_C):
-        file_keys.extend([obj['Key'] for obj in page.get('Contents', [])])
+def _init_worker(store, queue):
+    """Pool initializer that installs the progress store and recon queue in a worker."""
+    global progress_store, recon_queue
+    progress_store = store
+    recon_queue = queue
 
-    # Process all files in parallel using a single multiprocessing pool
-    with Pool(processes=os.cpu_count()) as pool:
-        pool.map(process_file_from_bucket_c, file_keys)
 
-
-"""
 def main():
     """Main function to process files from Bucket C."""
     # Create EFS directory if not exists
     os.makedirs(EFS_DIRECTORY, exist_ok=True)
 
-    # Setup reconciliation file
-    if not os.path.exists(RECON_FILE):
-        with open(RECON_FILE, "w") as recon:
-            recon.write("FileName,TotalLines,SuccessfulDownloads\n")
-
-    # Paginate through Bucket C to get all files
-    paginator = s3_client_c.get_paginator('list_objects_v2')
-
-    for page in paginator.paginate(Bucket=BUCKET_C):
-        # Collect file keys from the current page
-        file_keys = [obj['Key'] for obj in page.get('Contents', [])]
-
-        # Process all files in parallel using a multiprocessing pool
-        with Pool(processes=os.cpu_count()) as pool:
-            pool.map(process_file_from_bucket_c, file_keys)
+    # Setup reconciliation file; the sink writes the header if the file is new
+    recon_path = RECON_FILE
+    if RECON_SHARD_PER_RUN:
+        recon_path = os.path.join(EFS_DIRECTORY, f"reconciliation-{time.strftime('%Y%m%dT%H%M%S')}.csv")
+
+    # Load the checkpoint left by earlier runs; finished manifests are skipped
+    store = ProgressStore(PROGRESS_DIRECTORY)
+    print(f"Resuming with {len(store.completed_manifests)} manifests and "
+          f"{len(store.completed_objects)} Bucket B objects already complete")
+    pending_keys = (key for key in iter_bucket_c_keys() if not store.is_manifest_done(key))
+
+    # Stream keys from the parallel lister into one long-lived pool. At most
+    # MAX_IN_FLIGHT_FILES keys are handed to the pool before a result comes back,
+    # so listing, downloading and uploading overlap without buffering the bucket.
+    window = threading.Semaphore(MAX_IN_FLIGHT_FILES)
+    stop = threading.Event()
+
+    sink = ReconciliationSink(
+        recon_path,
+        batch_size=RECON_BATCH_SIZE,
+        flush_interval=RECON_FLUSH_INTERVAL,
+        on_complete=store.mark_manifest_done
+    )
+
+    with sink, Pool(processes=os.cpu_count(), initializer=_init_worker, initargs=(store, sink.queue)) as pool:
+        try:
+            file_keys = bounded(pending_keys, window, stop)
+            for _ in pool.imap_unordered(process_file_from_bucket_c, file_keys):
+                window.release()
+            # Let workers exit cleanly so their queued recon rows reach the sink
+            pool.close()
+            pool.join()
+        finally:
+            stop.set()
+
+    store.close()
 
-        # Clear file_keys list after processing the page (no longer needed)
-        file_keys.clear()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,103 @@
+import multiprocessing
+import time
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+
+THROTTLE_ERROR_CODES = {
+    'SlowDown',
+    'Throttling',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'ServiceUnavailable',
+    'RequestTimeout',
+}
+
+
+def is_throttle_error(error):
+    """Return True if an exception is S3 (or another AWS service) asking us to slow down."""
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return code in THROTTLE_ERROR_CODES or status == 503
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on in-flight AWS calls, shared by every process forked after it is created.
+
+    Each request holds a slot while it runs. A request that is not throttled
+    and finishes within ``target_latency``, or that moved its ``nbytes`` at
+    ``target_throughput`` bytes per second or better, grows the limit
+    additively (about one slot per limit's worth of healthy requests); a
+    throttled request multiplies it by ``backoff``, at most once per
+    ``cooldown`` seconds so one burst of 503s only halves it once. Slow but
+    successful requests leave the limit unchanged.
+    """
+
+    def __init__(self, initial=16, minimum=1, maximum=512, target_latency=2.0, target_throughput=4 * 1024 ** 2,
+                 backoff=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.target_throughput = target_throughput
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._condition = multiprocessing.Condition()
+        self._limit = multiprocessing.Value('d', float(initial), lock=False)
+        self._in_flight = multiprocessing.Value('i', 0, lock=False)
+        self._last_decrease = multiprocessing.Value('d', 0.0, lock=False)
+
+    @property
+    def limit(self):
+        return int(self._limit.value)
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight.value >= max(self.minimum, int(self._limit.value)):
+                self._condition.wait()
+            self._in_flight.value += 1
+
+    def _healthy(self, latency, nbytes):
+        return latency <= self.target_latency or (nbytes and nbytes / latency >= self.target_throughput)
+
+    def release(self, latency, throttled=False, nbytes=0):
+        with self._condition:
+            self._in_flight.value -= 1
+            if throttled:
+                now = time.time()
+                if now - self._last_decrease.value >= self.cooldown:
+                    self._limit.value = max(self.minimum, self._limit.value * self.backoff)
+                    self._last_decrease.value = now
+            elif self._healthy(latency, nbytes):
+                self._limit.value = min(self.maximum, self._limit.value + 1.0 / self._limit.value)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, nbytes=0):
+        """Hold a slot for the duration of one request; throttling errors raised inside it shrink the limit.
+
+        ``nbytes`` is the size of the transfer, so large transfers are judged
+        by throughput rather than latency. The yielded dict can be used to
+        report throttling that did not raise, e.g. a response that only
+        succeeded after botocore retries, or to set ``nbytes`` once known.
+        """
+        self.acquire()
+        outcome = {'throttled': False, 'nbytes': nbytes}
+        start = time.monotonic()
+        try:
+            yield outcome
+        except Exception as e:
+            if is_throttle_error(e):
+                outcome['throttled'] = True
+            raise
+        finally:
+            self.release(time.monotonic() - start, outcome['throttled'], outcome['nbytes'])
+
+    def call(self, func, *args, nbytes=0, **kwargs):
+        """Run one client call under a slot, treating a retried response as a throttling signal."""
+        with self.slot(nbytes) as outcome:
+            response = func(*args, **kwargs)
+            if isinstance(response, dict) and response.get('ResponseMetadata', {}).get('RetryAttempts'):
+                outcome['throttled'] = True
+            return response
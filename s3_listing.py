@@ -0,0 +1,118 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+def discover_split_keys(s3_client, bucket, prefix="", delimiter="/", depth=1):
+    """Find the prefix fan-out of a bucket with delimiter listings.
+
+    Returns the sorted common prefixes ``depth`` levels below ``prefix``; they
+    are used as split points between key ranges that can be listed in parallel.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    level = [prefix]
+    for _ in range(depth):
+        next_level = []
+        for level_prefix in level:
+            children = []
+            for page in paginator.paginate(Bucket=bucket, Prefix=level_prefix, Delimiter=delimiter):
+                children.extend(cp['Prefix'] for cp in page.get('CommonPrefixes', []))
+            # A prefix with no sub-prefixes stays a split point of its own
+            next_level.extend(children or [level_prefix])
+        level = next_level
+    return sorted(key for key in level if key != prefix)
+
+
+def bounded(items, window, stop):
+    """Yield items only while a slot in ``window`` is free; the consumer releases a slot per result."""
+    for item in items:
+        while not window.acquire(timeout=1):
+            if stop.is_set():
+                return
+        yield item
+
+
+def _key_before(key):
+    """Return a StartAfter value that sorts before ``key`` and close to it."""
+    last = ord(key[-1])
+    return key[:-1] + chr(last - 1) if last > 0 else key[:-1]
+
+
+def _put(items, item, stop):
+    """Put ``item`` on a bounded queue, giving up once the consumer has gone away."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _list_range(s3_client, bucket, prefix, start, end, items, stop):
+    """List the keys in ``[start, end)`` under ``prefix`` onto ``items``, then put the done marker."""
+    try:
+        if stop.is_set():
+            return
+        paginator = s3_client.get_paginator('list_objects_v2')
+        kwargs = {'Bucket': bucket, 'Prefix': prefix}
+        if start:
+            kwargs['StartAfter'] = _key_before(start)
+        for page in paginator.paginate(**kwargs):
+            for obj in page.get('Contents', []):
+                if start and obj['Key'] < start:
+                    continue
+                if end is not None and obj['Key'] >= end:
+                    return
+                if not _put(items, obj, stop):
+                    return
+    except Exception as e:
+        _put(items, e, stop)
+    finally:
+        _put(items, _DONE, stop)
+
+
+def list_objects_parallel(s3_client, bucket, prefix="", split_keys=None, delimiter="/", depth=1,
+                          max_workers=16, ordered=False, buffer_size=1000):
+    """Yield every object under ``prefix`` by running many paginators at once.
+
+    The key space is cut into ranges at ``split_keys``, or at the prefixes
+    found by ``discover_split_keys`` when no split keys are given, and each
+    range is listed on its own thread. With ``ordered=True`` objects come out
+    in the same lexicographic order as a single ``list_objects_v2`` walk, and
+    ranges further ahead are listed while earlier ones are consumed; otherwise
+    objects are yielded as soon as any range produces them. Each range buffers
+    at most ``buffer_size`` objects, so memory stays bounded.
+    """
+    if split_keys is None:
+        split_keys = discover_split_keys(s3_client, bucket, prefix, delimiter, depth)
+    boundaries = sorted(set(split_keys))
+    ranges = list(zip([None] + boundaries, boundaries + [None]))
+
+    stop = threading.Event()
+    shared = queue.Queue(maxsize=buffer_size)
+    range_queues = [queue.Queue(maxsize=buffer_size) if ordered else shared for _ in ranges]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ranges)))) as executor:
+        try:
+            for (start, end), items in zip(ranges, range_queues):
+                executor.submit(_list_range, s3_client, bucket, prefix, start, end, items, stop)
+
+            if ordered:
+                sources = [(items, 1) for items in range_queues]
+            else:
+                sources = [(shared, len(ranges))]
+
+            for items, pending in sources:
+                while pending:
+                    obj = items.get()
+                    if obj is _DONE:
+                        pending -= 1
+                    elif isinstance(obj, Exception):
+                        raise obj
+                    else:
+                        yield obj
+        finally:
+            stop.set()
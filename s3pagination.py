@@ -1,42 +1,223 @@
-import boto3
 import multiprocessing
-from botocore.config import Config
+import threading
+from aws_clients import get_client
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from s3_concurrency import AdaptiveConcurrencyLimiter
+from s3_listing import bounded, list_objects_parallel
 
-# Configure S3 client with retries
-custom_config = Config(
-    retries={
-        'max_attempts': 10,
-        'mode': 'adaptive'
-    }
-)
-s3_client = boto3.client('s3', config=custom_config)
+# Size of the keep-alive connection pool of each process's S3 client; it is
+# shared by the multipart part threads and the listing threads
+S3_MAX_POOL_CONNECTIONS = 64
+
+def s3_client():
+    """S3 client with adaptive retries, created once per process."""
+    return get_client('s3', max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+
+# In-flight copy calls are capped by an AIMD limit shared with the forked copy workers
+s3_limiter = AdaptiveConcurrencyLimiter()
 
 SOURCE_BUCKET = "your-source-bucket"
 DEST_BUCKET = "your-destination-bucket"
 
-def copy_object_worker(object_key):
-    """Worker function to copy a single object."""
+# Copy calls are I/O bound, so run more processes than cores and let
+# s3_limiter decide how many of them are actually talking to S3
+COPY_PROCESSES = multiprocessing.cpu_count() * 4
+
+# Objects handed to the copy pool ahead of their results
+MAX_IN_FLIGHT_COPIES = COPY_PROCESSES * 4
+
+# Objects at or above this size are copied with parallel UploadPartCopy ranges
+MULTIPART_COPY_THRESHOLD = 512 * 1024 * 1024
+MULTIPART_COPY_PART_SIZE = 256 * 1024 * 1024
+MULTIPART_COPY_CONCURRENCY = 8
+
+# Sync mode copies only keys that are new or changed in the source;
+# DELETE_EXTRANEOUS also removes destination keys missing from the source
+SYNC_MODE = False
+DELETE_EXTRANEOUS = False
+# Extraneous keys are deleted this many per DeleteObjects request (S3 allows at most 1000)
+DELETE_BATCH_SIZE = 1000
+
+# Listings are split at the prefixes LIST_PREFIX_DEPTH levels down, or at
+# LIST_SPLIT_KEYS when set, and LIST_WORKERS ranges are listed at once
+LIST_WORKERS = 16
+LIST_PREFIX_DEPTH = 1
+LIST_SPLIT_KEYS = None
+
+# S3 limits for multipart uploads
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+def _part_ranges(size, part_size):
+    """Split ``size`` bytes into inclusive byte ranges of at most ``part_size`` bytes."""
+    part_size = max(part_size, MIN_PART_SIZE, -(-size // MAX_PARTS))
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+def multipart_copy_object(object_key, size, part_size=MULTIPART_COPY_PART_SIZE,
+                          concurrency=MULTIPART_COPY_CONCURRENCY):
+    """Copy a large object with UploadPartCopy ranges run in parallel.
+
+    Content type and user metadata are carried over from the source object, and
+    every part is pinned to the source ETag. If any part fails the multipart
+    upload is aborted so no orphaned parts are left behind.
+    """
+    head = s3_client().head_object(Bucket=SOURCE_BUCKET, Key=object_key)
+    create_args = {'Metadata': head.get('Metadata', {})}
+    for field in ('ContentType', 'ContentEncoding', 'ContentDisposition', 'ContentLanguage', 'CacheControl'):
+        if field in head:
+            create_args[field] = head[field]
+
+    upload_id = s3_client().create_multipart_upload(
+        Bucket=DEST_BUCKET, Key=object_key, **create_args
+    )['UploadId']
+
+    def copy_part(part_number, byte_range):
+        response = s3_limiter.call(
+            s3_client().upload_part_copy,
+            Bucket=DEST_BUCKET,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource={'Bucket': SOURCE_BUCKET, 'Key': object_key},
+            CopySourceIfMatch=head['ETag'],
+            CopySourceRange=f"bytes={byte_range[0]}-{byte_range[1]}",
+            nbytes=byte_range[1] - byte_range[0] + 1
+        )
+        return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            parts = list(executor.map(copy_part, range(1, MAX_PARTS + 1), _part_ranges(size, part_size)))
+        s3_client().complete_multipart_upload(
+            Bucket=DEST_BUCKET,
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except BaseException:
+        s3_client().abort_multipart_upload(Bucket=DEST_BUCKET, Key=object_key, UploadId=upload_id)
+        raise
+
+
+def copy_object_worker(obj):
+    """Worker function to copy a single object, picking single or multipart copy by size."""
+    object_key = obj['Key']
     try:
-        copy_source = {'Bucket': SOURCE_BUCKET, 'Key': object_key}
-        s3_client.copy_object(CopySource=copy_source, Bucket=DEST_BUCKET, Key=object_key)
+        if obj.get('Size', 0) >= MULTIPART_COPY_THRESHOLD:
+            multipart_copy_object(object_key, obj['Size'])
+        else:
+            copy_source = {'Bucket': SOURCE_BUCKET, 'Key': object_key}
+            s3_limiter.call(s3_client().copy_object, CopySource=copy_source, Bucket=DEST_BUCKET, Key=object_key,
+                            nbytes=obj.get('Size', 0))
         print(f"Copied: {object_key}")
     except ClientError as e:
         print(f"Failed to copy {object_key}: {e}")
 
-def process_page(page):
-    """Process a single page of objects."""
-    object_keys = [obj['Key'] for obj in page.get('Contents', [])]
-    with multiprocessing.Pool(processes=multiprocessing.cpu_count()) as pool:
-        pool.map(copy_object_worker, object_keys)
+def copy_objects(pool, objects):
+    """Copy objects on a long-lived worker pool as they stream in.
+
+    At most MAX_IN_FLIGHT_COPIES objects are handed to the pool before a
+    result comes back, so a slow multipart copy only occupies its own worker
+    while the others, and the listing feeding them, keep going.
+    """
+    window = threading.Semaphore(MAX_IN_FLIGHT_COPIES)
+    stop = threading.Event()
+    items = ({'Key': obj['Key'], 'Size': obj['Size']} for obj in objects)
+    try:
+        for _ in pool.imap_unordered(copy_object_worker, bounded(items, window, stop)):
+            window.release()
+    finally:
+        stop.set()
+
+def delete_objects(object_keys):
+    """Delete up to 1000 keys from the destination bucket in one request."""
+    response = s3_client().delete_objects(
+        Bucket=DEST_BUCKET,
+        Delete={'Objects': [{'Key': key} for key in object_keys], 'Quiet': True}
+    )
+    for error in response.get('Errors', []):
+        print(f"Failed to delete {error['Key']}: {error['Message']}")
+    print(f"Deleted {len(object_keys) - len(response.get('Errors', []))} extraneous objects")
+
+def iter_objects(bucket, ordered=True):
+    """Yield every object in a bucket from parallel listings, in key order unless ordered is False."""
+    return list_objects_parallel(
+        s3_client(),
+        bucket,
+        split_keys=LIST_SPLIT_KEYS,
+        depth=LIST_PREFIX_DEPTH,
+        max_workers=LIST_WORKERS,
+        ordered=ordered
+    )
+
+def objects_match(source, dest):
+    """Return True if the destination object is an identical copy of the source object."""
+    if source['Size'] != dest['Size']:
+        return False
+    if source['ETag'] == dest['ETag']:
+        return True
+    # A multipart copy never reproduces its source's ETag, so for multipart
+    # ETags a destination written after the source counts as up to date
+    if '-' in source['ETag'] or '-' in dest['ETag']:
+        return dest['LastModified'] >= source['LastModified']
+    return False
+
+def diff_listings(source_objects, dest_objects):
+    """Merge-join two key-ordered listings.
+
+    Yields ('copy', obj) for source objects that are new or changed and
+    ('delete', obj) for destination objects with no source counterpart.
+    """
+    source_objects = iter(source_objects)
+    dest_objects = iter(dest_objects)
+    source = next(source_objects, None)
+    dest = next(dest_objects, None)
+
+    while source is not None or dest is not None:
+        if dest is None or (source is not None and source['Key'] < dest['Key']):
+            yield 'copy', source
+            source = next(source_objects, None)
+        elif source is None or dest['Key'] < source['Key']:
+            yield 'delete', dest
+            dest = next(dest_objects, None)
+        else:
+            if not objects_match(source, dest):
+                yield 'copy', source
+            source = next(source_objects, None)
+            dest = next(dest_objects, None)
+
+def _objects_to_sync(delete_extraneous):
+    """Yield new or changed source objects, deleting extraneous destination keys in batches on the way."""
+    to_delete = []
+    for action, obj in diff_listings(iter_objects(SOURCE_BUCKET), iter_objects(DEST_BUCKET)):
+        if action == 'copy':
+            yield obj
+        elif delete_extraneous:
+            to_delete.append(obj['Key'])
+            if len(to_delete) >= DELETE_BATCH_SIZE:
+                delete_objects(to_delete)
+                to_delete = []
+
+    if to_delete:
+        delete_objects(to_delete)
 
-def copy_objects_streaming():
-    """Stream and copy objects page by page."""
-    paginator = s3_client.get_paginator('list_objects_v2')
+def sync_objects_streaming(pool, delete_extraneous=DELETE_EXTRANEOUS):
+    """Copy only new or changed objects, optionally deleting extraneous destination objects."""
+    copy_objects(pool, _objects_to_sync(delete_extraneous))
 
-    for page in paginator.paginate(Bucket=SOURCE_BUCKET):
-        if 'Contents' in page:
-            process_page(page)
+def copy_objects_streaming(sync=SYNC_MODE):
+    """Stream every object, or only the delta in sync mode, into one long-lived copy pool."""
+    # The pool is forked before any listing thread starts
+    with multiprocessing.Pool(processes=COPY_PROCESSES) as pool:
+        if sync:
+            sync_objects_streaming(pool)
+        else:
+            copy_objects(pool, iter_objects(SOURCE_BUCKET, ordered=False))
+        pool.close()
+        pool.join()
 
 if __name__ == "__main__":
-    copy_objects_streaming()
\ No newline at end of file
+    copy_objects_streaming()
@@ -1,62 +1,204 @@
 import multiprocessing
+import platform
 import time
 import struct
+import zlib
 from multiprocessing import shared_memory, Lock
 import datetime
+from contextlib import nullcontext
 
 TOKEN_SIZE = 64  # Max size for the token string
-PACK_FORMAT = f'{TOKEN_SIZE}s d'  # Format: Token as a fixed-size byte string + a double for expiration time
 
-def generate_token():
+# Seqlock layout: an 8-byte version counter followed by the record it guards.
+# The counter is odd while a write is in progress and even otherwise.
+SEQ_FORMAT = 'Q'
+SEQ_SIZE = struct.calcsize(SEQ_FORMAT)
+# Lock-free seqlock reads are only sound where stores are seen in program order (see seqlock_read)
+LOCK_FREE_READS = platform.machine().lower() in ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+
+# Token table layout: NUM_SLOTS slots, each a seqlock counter followed by
+# a name, a token and an expiration time. A slot with an empty name is free.
+NAME_SIZE = 32
+SLOT_FORMAT = f'{NAME_SIZE}s {TOKEN_SIZE}s d'
+SLOT_SIZE = SEQ_SIZE + struct.calcsize(SLOT_FORMAT)
+NUM_SLOTS = 64
+REFRESH_AHEAD = 10 * 60  # Seconds before expiry at which the refresher renews a token
+REFRESH_POLL_INTERVAL = 5
+
+def generate_token(name=None):
     """Simulate token generation."""
-    new_token = f"token_{int(time.time())}".encode('utf-8')
+    prefix = f"{name}_token" if name else "token"
+    new_token = f"{prefix}_{int(time.time())}".encode('utf-8')
     new_token = new_token.ljust(TOKEN_SIZE, b'\0')  # Ensure token has a fixed size
     expiration_time = (datetime.datetime.now() + datetime.timedelta(hours=2)).timestamp()
     print(f"Token generated: {new_token.decode('utf-8').strip()}, Expires at: {datetime.datetime.fromtimestamp(expiration_time)}")
     return new_token, expiration_time
 
-def task(shared_mem_name, lock):
-    """Task that checks and refreshes the token if expired."""
-    existing_shm = shared_memory.SharedMemory(name=shared_mem_name)
-    
-    try:
+def seqlock_read(buf, offset, record_format):
+    """Read the record at offset without the lock, retrying only if a write overlapped the read.
+
+    There are no memory barriers here: this relies on x86 stores becoming
+    visible to other cores in program order. On other architectures (ARM,
+    POWER) a reader could see the new record next to an old even counter,
+    so there callers read under the lock instead (see LOCK_FREE_READS).
+    """
+    while True:
+        seq_before = struct.unpack_from(SEQ_FORMAT, buf, offset)[0]
+        if seq_before & 1:
+            time.sleep(0)  # A writer is mid-update; yield and try again
+            continue
+        record = struct.unpack_from(record_format, buf, offset + SEQ_SIZE)
+        if struct.unpack_from(SEQ_FORMAT, buf, offset)[0] == seq_before:
+            return record
+
+
+def seqlock_write(buf, offset, record_format, *values):
+    """Publish a new record at offset; the caller must hold the lock."""
+    seq = struct.unpack_from(SEQ_FORMAT, buf, offset)[0]
+    struct.pack_into(SEQ_FORMAT, buf, offset, seq + 1)
+    struct.pack_into(record_format, buf, offset + SEQ_SIZE, *values)
+    struct.pack_into(SEQ_FORMAT, buf, offset, seq + 2)
+
+
+class TokenTable:
+    """Fixed-size, hash-indexed table of named tokens in one SharedMemory segment.
+
+    Names are placed by CRC32 with linear probing and never move once
+    inserted, so lookups read slots lock-free through their seqlocks. The
+    lock is only taken to insert a name or to replace a token, and by
+    lookups given the lock on machines where lock-free reads are unsafe.
+    """
+
+    def __init__(self, shm, num_slots=NUM_SLOTS):
+        self.shm = shm
+        self.num_slots = num_slots
+
+    @classmethod
+    def create(cls, num_slots=NUM_SLOTS):
+        # New shared memory is zero-filled: every slot is free with an even counter
+        return cls(shared_memory.SharedMemory(create=True, size=num_slots * SLOT_SIZE), num_slots)
+
+    @classmethod
+    def attach(cls, shared_mem_name, num_slots=NUM_SLOTS):
+        return cls(shared_memory.SharedMemory(name=shared_mem_name), num_slots)
+
+    @staticmethod
+    def _encode_name(name):
+        encoded = name.encode('utf-8')
+        if not encoded or len(encoded) > NAME_SIZE:
+            raise ValueError(f"Token name must be 1 to {NAME_SIZE} bytes: {name!r}")
+        return encoded.ljust(NAME_SIZE, b'\0')
+
+    def _probe(self, encoded_name):
+        """Yield (slot offset, slot record) from the name's home slot until a match or a free slot."""
+        start = zlib.crc32(encoded_name) % self.num_slots
+        for i in range(self.num_slots):
+            offset = ((start + i) % self.num_slots) * SLOT_SIZE
+            record = seqlock_read(self.shm.buf, offset, SLOT_FORMAT)
+            yield offset, record
+            if record[0] in (encoded_name, b'\0' * NAME_SIZE):
+                return
+
+    def _find(self, encoded_name):
+        for offset, record in self._probe(encoded_name):
+            if record[0] == encoded_name:
+                return offset, record
+        return None, None
+
+    @staticmethod
+    def _read_lock(lock):
+        return lock if lock is not None and not LOCK_FREE_READS else nullcontext()
+
+    def get(self, name, lock=None):
+        """Lock-free lookup; returns (token bytes, expiration time) or None if the name is unknown.
+
+        Pass the writers' lock so that reads fall back to it off x86.
+        """
+        with self._read_lock(lock):
+            _, record = self._find(self._encode_name(name))
+        return record[1:] if record else None
+
+    def put(self, name, token, expiration_time, lock):
+        """Insert or replace the token for a name."""
+        encoded_name = self._encode_name(name)
         with lock:
-            # Unpack the shared memory buffer into a token and expiration time
-            token_bytes, expiration_time = struct.unpack(PACK_FORMAT, existing_shm.buf[:struct.calcsize(PACK_FORMAT)])
-            
-            # Get current time
-            current_time = time.time()
-            
-            # Check expiration
-            if current_time >= expiration_time:
-                print(f"Process {multiprocessing.current_process().name} found the token expired, refreshing...")
-                
-                # Generate a new token and update the shared memory
-                new_token, new_expiration = generate_token()
-                packed_data = struct.pack(PACK_FORMAT, new_token, new_expiration)
-                existing_shm.buf[:struct.calcsize(PACK_FORMAT)] = packed_data
-            else:
-                print(f"Process {multiprocessing.current_process().name}: Token is still valid, expires at {datetime.datetime.fromtimestamp(expiration_time)}")
-    
+            for offset, record in self._probe(encoded_name):
+                if record[0] in (encoded_name, b'\0' * NAME_SIZE):
+                    seqlock_write(self.shm.buf, offset, SLOT_FORMAT, encoded_name, token, expiration_time)
+                    return
+        raise RuntimeError(f"Token table is full ({self.num_slots} slots)")
+
+    def names(self, lock=None):
+        for slot in range(self.num_slots):
+            with self._read_lock(lock):
+                name = seqlock_read(self.shm.buf, slot * SLOT_SIZE, SLOT_FORMAT)[0].rstrip(b'\0')
+            if name:
+                yield name.decode('utf-8')
+
+    def refresh(self, name, lock, refresh_ahead=0):
+        """Single-flight refresh: regenerate the token only if it is still due once the lock is held."""
+        with lock:
+            offset, record = self._find(self._encode_name(name))
+            if record is None or time.time() < record[2] - refresh_ahead:
+                return
+            new_token, new_expiration = generate_token(name)
+            seqlock_write(self.shm.buf, offset, SLOT_FORMAT, record[0], new_token, new_expiration)
+
+    def close(self):
+        self.shm.close()
+
+
+def token_refresher(shared_mem_name, lock, stop_event, num_slots=NUM_SLOTS,
+                    refresh_ahead=REFRESH_AHEAD, poll_interval=REFRESH_POLL_INTERVAL):
+    """Background process that renews every token REFRESH_AHEAD seconds before it expires."""
+    table = TokenTable.attach(shared_mem_name, num_slots)
+    try:
+        while not stop_event.is_set():
+            for name in table.names(lock):
+                _, expiration_time = table.get(name, lock)
+                if time.time() >= expiration_time - refresh_ahead:
+                    print(f"Refresher renewing token '{name}' ahead of expiry")
+                    table.refresh(name, lock, refresh_ahead)
+            stop_event.wait(poll_interval)
+    finally:
+        table.close()
+
+
+def table_task(shared_mem_name, lock, name, num_slots=NUM_SLOTS):
+    """Task that reads a named token lock-free, refreshing it only if the refresher fell behind."""
+    table = TokenTable.attach(shared_mem_name, num_slots)
+    try:
+        token_bytes, expiration_time = table.get(name, lock)
+        if time.time() >= expiration_time:
+            table.refresh(name, lock)
+            token_bytes, expiration_time = table.get(name, lock)
+        print(f"Process {multiprocessing.current_process().name}: Token '{name}' expires at {datetime.datetime.fromtimestamp(expiration_time)}")
     finally:
-        existing_shm.close()
+        table.close()
+
 
 if __name__ == '__main__':
-    # Create shared memory for the token and expiration time
-    shm = shared_memory.SharedMemory(create=True, size=struct.calcsize(PACK_FORMAT))
+    # Create one shared table holding a token per service
+    table = TokenTable.create()
+    services = ["s3", "sqs", "aurora"]
+    
+    # Lock to synchronize writers
+    lock = Lock()
     
     # Initial token creation
-    initial_token, initial_expiration = generate_token()
-    packed_data = struct.pack(PACK_FORMAT, initial_token, initial_expiration)
-    shm.buf[:struct.calcsize(PACK_FORMAT)] = packed_data
+    for service in services:
+        initial_token, initial_expiration = generate_token(service)
+        table.put(service, initial_token, initial_expiration, lock)
     
-    # Lock to synchronize processes
-    lock = Lock()
+    # Renew tokens ahead of expiry so tasks never wait for token generation
+    stop_event = multiprocessing.Event()
+    refresher = multiprocessing.Process(target=token_refresher, args=(table.shm.name, lock, stop_event))
+    refresher.start()
     
     try:
         while True:
             # Create a new process every 3 seconds to execute the task method
-            process = multiprocessing.Process(target=task, args=(shm.name, lock))
+            process = multiprocessing.Process(target=table_task, args=(table.shm.name, lock, services[int(time.time()) % len(services)]))
             process.start()
             
             # Wait 3 seconds before starting another process
@@ -68,6 +210,8 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         print("Stopping processes...")
     
-    # Clean up shared memory when the program stops
-    shm.close()
-    shm.unlink()
+    # Stop the refresher and clean up shared memory when the program stops
+    stop_event.set()
+    refresher.join()
+    table.shm.close()
+    table.shm.unlink()
@@ -0,0 +1,102 @@
+import threading
+import time
+
+# SQS accepts at most 10 entries per batch call
+MAX_BATCH_SIZE = 10
+
+
+class SqsAckManager:
+    """Batches message deletes and keeps in-flight messages invisible while they are worked on.
+
+    Call track() when a message is received, then ack() once it is processed
+    or nack() if it failed or its worker died. Acked receipt handles are
+    deleted with ``delete_message_batch`` as soon as 10 are pending or
+    ``flush_interval`` seconds have passed. Nacked ones stop being tracked and
+    are redelivered after a backoff of ``retry_backoff`` seconds, doubled for
+    every earlier receive of the message up to ``max_retry_backoff``, so a
+    poison message is not retried in a hot loop. Every ``heartbeat_interval``
+    seconds the visibility timeout of every tracked message is extended to
+    ``visibility_timeout`` seconds, so slow jobs are not redelivered while
+    they are still running.
+    """
+
+    def __init__(self, sqs_client, queue_url, flush_interval=1.0, visibility_timeout=60, heartbeat_interval=20,
+                 retry_backoff=30, max_retry_backoff=900):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.flush_interval = flush_interval
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._in_flight = {}
+        self._to_delete = []
+        self._to_release = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sqs-ack-manager", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Delete or release everything still pending and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def track(self, receipt_handle, receive_count=1):
+        """Start heartbeating a message; ``receive_count`` is its ApproximateReceiveCount."""
+        with self._condition:
+            self._in_flight[receipt_handle] = receive_count
+
+    def ack(self, receipt_handle):
+        with self._condition:
+            self._in_flight.pop(receipt_handle, None)
+            self._to_delete.append({'ReceiptHandle': receipt_handle})
+            if len(self._to_delete) >= MAX_BATCH_SIZE:
+                self._condition.notify()
+
+    def nack(self, receipt_handle):
+        with self._condition:
+            receive_count = self._in_flight.pop(receipt_handle, 1)
+            backoff = min(self.max_retry_backoff, self.retry_backoff * 2 ** (receive_count - 1))
+            self._to_release.append({'ReceiptHandle': receipt_handle, 'VisibilityTimeout': backoff})
+            self._condition.notify()
+
+    def _run(self):
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+        while True:
+            with self._condition:
+                if not self._closed and len(self._to_delete) < MAX_BATCH_SIZE and not self._to_release:
+                    self._condition.wait(self.flush_interval)
+                to_delete, self._to_delete = self._to_delete, []
+                to_release, self._to_release = self._to_release, []
+                closed = self._closed
+                in_flight = list(self._in_flight) if time.monotonic() >= next_heartbeat else None
+
+            self._send_batches('delete_message_batch', to_delete)
+            self._send_batches('change_message_visibility_batch', to_release)
+            if in_flight is not None:
+                self._send_batches('change_message_visibility_batch', [
+                    {'ReceiptHandle': receipt_handle, 'VisibilityTimeout': self.visibility_timeout}
+                    for receipt_handle in in_flight
+                ])
+                next_heartbeat = time.monotonic() + self.heartbeat_interval
+            if closed:
+                return
+
+    def _send_batches(self, operation, entries):
+        for start in range(0, len(entries), MAX_BATCH_SIZE):
+            batch = [{'Id': str(i), **entry} for i, entry in enumerate(entries[start:start + MAX_BATCH_SIZE])]
+            try:
+                response = getattr(self.sqs_client, operation)(QueueUrl=self.queue_url, Entries=batch)
+            except Exception as e:
+                print(f"Error calling {operation} for {len(batch)} messages: {e}")
+                continue
+            for failure in response.get('Failed', []):
+                print(f"{operation} failed for entry {failure['Id']}: {failure.get('Message', failure.get('Code'))}")
@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+import aws_clients
+from aws_clients import get_client
+
+def test_identical_calls_share_one_client():
+    """The retries dict is copied, so botocore rewriting it does not break the cache key."""
+    retries = {'max_attempts': 3}
+    assert get_client('s3', region_name='us-east-1') is get_client('s3', region_name='us-east-1')
+    assert get_client('s3', retries=retries) is get_client('s3', retries=retries)
+    assert retries == {'max_attempts': 3}
+    assert aws_clients.DEFAULT_RETRIES == {'max_attempts': 10, 'mode': 'adaptive'}
@@ -0,0 +1,84 @@
+import io
+import os
+import threading
+import time
+import pytest
+
+botocore_session = pytest.importorskip("botocore.session")
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from efs_object_cache import EfsObjectCache, LOCK_SUFFIX
+
+BUCKET = "bucket-b"
+
+@pytest.fixture
+def s3():
+    client = botocore_session.get_session().create_client(
+        "s3", region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+def expect_head(stubber, key, etag):
+    stubber.add_response("head_object", {"ETag": etag}, {"Bucket": BUCKET, "Key": key})
+
+def expect_get(stubber, key, etag, data):
+    stubber.add_response(
+        "get_object",
+        {"ETag": etag, "Body": StreamingBody(io.BytesIO(data), len(data))},
+        {"Bucket": BUCKET, "Key": key, "IfMatch": etag},
+    )
+
+def test_miss_then_hit(tmp_path, s3):
+    """A miss downloads the object pinned to its ETag; a hit only needs the HEAD."""
+    client, stubber = s3
+    cache = EfsObjectCache(str(tmp_path), max_bytes=10 ** 6)
+
+    expect_head(stubber, "k", '"e1"')
+    expect_get(stubber, "k", '"e1"', b"object body")
+    path = cache.get(client, BUCKET, "k")
+    with open(path, "rb") as f:
+        assert f.read() == b"object body"
+
+    expect_head(stubber, "k", '"e1"')
+    assert cache.get(client, BUCKET, "k") == path
+    assert not os.path.exists(path + LOCK_SUFFIX)
+
+def test_waiter_uses_the_entry_downloaded_by_the_lock_holder(tmp_path, s3):
+    """While another worker holds the entry's lock, get() waits for the entry instead of downloading."""
+    client, stubber = s3
+    cache = EfsObjectCache(str(tmp_path), max_bytes=10 ** 6, poll_interval=0.01)
+    path = cache._entry_path(BUCKET, "k", '"e1"')
+    os.makedirs(os.path.dirname(path))
+    with open(path + LOCK_SUFFIX, "w") as lock:
+        lock.write("other worker")
+
+    expect_head(stubber, "k", '"e1"')
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(cache.get(client, BUCKET, "k")))
+    waiter.start()
+    time.sleep(0.1)
+    assert waiter.is_alive()
+
+    with open(path, "wb") as f:
+        f.write(b"downloaded elsewhere")
+    os.remove(path + LOCK_SUFFIX)
+    waiter.join(5)
+    assert result == [path]
+
+def test_eviction_keeps_the_cache_under_max_bytes(tmp_path, s3):
+    """Once a tenth of max_bytes has been added, the least recently used entries are evicted."""
+    client, stubber = s3
+    cache = EfsObjectCache(str(tmp_path), max_bytes=100)
+    paths = []
+    for i in range(3):
+        expect_head(stubber, f"k{i}", f'"e{i}"')
+        expect_get(stubber, f"k{i}", f'"e{i}"', bytes(40))
+        paths.append(cache.get(client, BUCKET, f"k{i}"))
+        # Entries touched in the same clock tick would tie on mtime
+        os.utime(paths[-1], (i, i))
+
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+    assert sum(os.path.getsize(path) for path in paths if os.path.exists(path)) <= 100
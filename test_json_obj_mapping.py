@@ -1,23 +1,31 @@
 import pytest
 import hashlib
-from src.json_obj_mapping import match_json_obj_files, calculate_checksum  # Adjust based on your module path
+import io
+import json
+from types import SimpleNamespace
+import json_obj_mapping
+from json_obj_mapping import match_json_obj_files, calculate_checksum, checksum_files, ChecksumCache, scan_dataset_tree
 
 @pytest.fixture
-def mock_os_listdir(mocker):
-    """Mock os.listdir to simulate directory contents."""
-    return mocker.patch("os.listdir", return_value=[
-        "a.json", "a.0.obj", "a.1.obj",
+def mock_os_scandir(mocker):
+    """Mock os.scandir to simulate directory contents."""
+    names = [
+        "a.json", "a.1.obj", "a.0.obj",
         "b.json", "b.0.obj",
         "c.json", "c.0.obj", "c.1.obj",
         "dataset.res"
-    ])
+    ]
+    scandir = mocker.patch("os.scandir")
+    scandir.return_value.__enter__.return_value = [SimpleNamespace(name=name) for name in names]
+    mocker.patch("json_obj_mapping.calculate_checksum", return_value="checksum")
+    return scandir
 
 @pytest.fixture
 def mock_open_res_file(mocker):
     """Mock opening a .res file to simulate reading its content."""
-    return mocker.patch("builtins.open", mocker.mock_open(read_data="test content"))
+    return mocker.patch("builtins.open", mocker.mock_open(read_data=b"test content"))
 
-def test_match_json_obj_files(mock_os_listdir):
+def test_match_json_obj_files(mock_os_scandir):
     """Test JSON to OBJ file matching logic without actual files."""
     result = match_json_obj_files("/fake/directory")  # Fake directory
 
@@ -43,4 +51,82 @@ def test_calculate_checksum(mock_open_res_file):
     # Expected SHA-256 checksum for "test content"
     expected_checksum = hashlib.sha256(b"test content").hexdigest()
 
-    assert calculate_checksum("/fake/dataset.res") == expected_checksum
\ No newline at end of file
+    assert calculate_checksum("/fake/dataset.res") == expected_checksum
+
+def test_match_json_obj_files_dotted_base_names(tmp_path):
+    """An OBJ file matches every JSON base name that ends at one of its dots."""
+    for name in ["a.json", "a.b.json", "a.b.0.obj", "a.0.obj", "ab.0.obj", "a.obj", "a.b.json.bak"]:
+        (tmp_path / name).write_bytes(b"")
+
+    result = match_json_obj_files(str(tmp_path))
+
+    assert result["a.json"].obj_files == ["a.0.obj", "a.b.0.obj"]
+    assert result["a.b.json"].obj_files == ["a.b.0.obj"]
+    assert "resource" not in result
+
+
+def test_checksum_files_in_process_pool(tmp_path):
+    """Checksums computed by the worker processes match hashlib."""
+    contents = {f"part{i}.obj": bytes([i]) * (json_obj_mapping.CHECKSUM_CHUNK_SIZE + i) for i in range(4)}
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+    paths = [str(tmp_path / name) for name in contents]
+
+    result = checksum_files(paths, max_workers=2)
+
+    assert result == {str(tmp_path / name): hashlib.sha256(data).hexdigest() for name, data in contents.items()}
+
+def test_checksum_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    """Cached checksums survive a reload and are only recomputed for changed files."""
+    res_path = tmp_path / "dataset.res"
+    res_path.write_bytes(b"test content")
+    cache_path = str(tmp_path / "checksums.json")
+
+    cache = ChecksumCache(cache_path)
+    checksum_files([str(res_path)], max_workers=1, cache=cache)
+    cache.save()
+
+    def fail(file_path):
+        raise AssertionError(f"{file_path} was hashed again")
+
+    monkeypatch.setattr(json_obj_mapping, "calculate_checksum", fail)
+    cache = ChecksumCache(cache_path)
+    assert checksum_files([str(res_path)], max_workers=1, cache=cache) == {
+        str(res_path): hashlib.sha256(b"test content").hexdigest()
+    }
+
+    monkeypatch.undo()
+    res_path.write_bytes(b"new content")
+    assert checksum_files([str(res_path)], max_workers=1, cache=cache) == {
+        str(res_path): hashlib.sha256(b"new content").hexdigest()
+    }
+
+
+def test_scan_dataset_tree_streams_ndjson(tmp_path):
+    """Every directory in the tree becomes one NDJSON record, with all of its .res files."""
+    root = tmp_path / "root"
+    files = {
+        "x.json": b"", "x.0.obj": b"",
+        "d1/a.json": b"", "d1/a.0.obj": b"", "d1/a.1.obj": b"", "d1/one.res": b"1", "d1/two.res": b"2",
+        "d1/d2/b.json": b"", "d1/d2/b.0.obj": b"",
+    }
+    for name, data in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_bytes(data)
+    cache_path = str(tmp_path / "checksums.json")
+
+    output = io.StringIO()
+    count = scan_dataset_tree(str(root), output, max_workers=2, max_in_flight=2, cache_path=cache_path)
+
+    records = {record["directory"]: record for record in map(json.loads, output.getvalue().splitlines())}
+    assert count == len(records) == 3
+    assert records[str(root)]["mappings"] == {"x.json": ["x.0.obj"]}
+    assert records[str(root / "d1")]["mappings"] == {"a.json": ["a.0.obj", "a.1.obj"]}
+    assert records[str(root / "d1")]["resources"] == {
+        "one.res": hashlib.sha256(b"1").hexdigest(),
+        "two.res": hashlib.sha256(b"2").hexdigest(),
+    }
+    assert records[str(root / "d1" / "d2")]["resources"] == {}
+
+    cache = ChecksumCache(cache_path)
+    assert cache.get(str(root / "d1" / "one.res")) == hashlib.sha256(b"1").hexdigest()
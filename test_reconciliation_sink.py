@@ -0,0 +1,27 @@
+import csv
+import pytest
+from reconciliation_sink import ReconciliationSink, RECON_HEADER
+
+def test_rows_are_written_and_completed_keys_reported(tmp_path):
+    path = str(tmp_path / "reconciliation.csv")
+    completed = []
+    with ReconciliationSink(path, batch_size=2, on_complete=completed.append) as sink:
+        for i in range(5):
+            sink.queue.put((f"file{i}", 10, 10 - i, i % 2 == 0))
+
+    with open(path, newline="") as f:
+        assert list(csv.reader(f)) == [RECON_HEADER] + [[f"file{i}", "10", str(10 - i)] for i in range(5)]
+    assert completed == ["file0", "file2", "file4"]
+
+def test_writer_error_keeps_draining_and_is_raised_on_close(tmp_path):
+    """A failing on_complete does not stop the queue being drained; close() raises the error."""
+    def on_complete(file_key):
+        raise OSError("progress store unavailable")
+
+    sink = ReconciliationSink(str(tmp_path / "reconciliation.csv"), batch_size=1, on_complete=on_complete)
+    sink.start()
+    # Far more than a pipe buffer holds, so a dead writer would leave the queue's feeder blocked
+    for i in range(20000):
+        sink.queue.put((f"file{i}", 1, 1, True))
+    with pytest.raises(OSError, match="progress store unavailable"):
+        sink.close()
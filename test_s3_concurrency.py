@@ -0,0 +1,90 @@
+import pytest
+import s3_concurrency
+from botocore.exceptions import ClientError
+from s3_concurrency import AdaptiveConcurrencyLimiter
+
+class FakeClock:
+    """Stands in for the time module; requests take ``latency`` seconds each."""
+
+    def __init__(self, latency=0.1):
+        self.now = 1000.0
+        self.latency = latency
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        # slot() reads the clock at the start and end of a request
+        self.now += self.latency
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(s3_concurrency, "time", clock)
+    return clock
+
+def throttle():
+    return ClientError({"Error": {"Code": "SlowDown"}}, "GetObject")
+
+def test_healthy_requests_grow_the_limit_by_one_per_limit(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=4)
+    for _ in range(4):
+        with limiter.slot():
+            pass
+    # Four increments of about 1/limit add up to one slot
+    assert limiter._limit.value == pytest.approx(4.93, abs=0.01)
+    with limiter.slot():
+        pass
+    assert limiter.limit == 5
+
+def test_throttles_back_off_once_per_cooldown(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=16, cooldown=1.0)
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            with limiter.slot():
+                raise throttle()
+    assert limiter.limit == 8
+
+    clock.now += 1.0
+    with pytest.raises(ClientError):
+        with limiter.slot():
+            raise throttle()
+    assert limiter.limit == 4
+
+def test_backoff_stops_at_minimum(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=2, minimum=2, cooldown=0)
+    limiter.acquire()
+    limiter.release(0.1, throttled=True)
+    assert limiter.limit == 2
+
+def test_slow_transfers_are_judged_by_throughput(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=10, target_latency=1.0, target_throughput=1000)
+    clock.latency = 10.0
+
+    with limiter.slot(nbytes=5000):  # 500 bytes/s: slow, limit unchanged
+        pass
+    assert limiter._limit.value == 10
+
+    with limiter.slot() as outcome:
+        outcome["nbytes"] = 20000  # 2000 bytes/s, reported once the transfer is done
+    assert limiter._limit.value == pytest.approx(10.1)
+
+def test_call_treats_retried_responses_as_throttles(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=16)
+    response = {"ResponseMetadata": {"RetryAttempts": 2}}
+
+    assert limiter.call(lambda: response) is response
+    assert limiter.limit == 8
+    assert limiter._in_flight.value == 0
+
+    clock.now += 1.0
+    limiter.call(lambda: {"ResponseMetadata": {"RetryAttempts": 0}})
+    assert limiter._limit.value == pytest.approx(8.125)
+
+def test_non_throttle_errors_leave_the_limit_alone(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial=16)
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("boom")
+    assert limiter._limit.value == pytest.approx(16 + 1 / 16)
@@ -0,0 +1,80 @@
+import pytest
+from s3_listing import discover_split_keys, list_objects_parallel
+
+KEYS = sorted([
+    "a", "a/1", "a/2", "a/b/1", "b", "b/", "b/1", "b/c/1", "b/c/2", "b0",
+    "c/x/1", "c/y/1", "c/y/2", "d/1", "e",
+] + [f"f/{i:03}" for i in range(25)])
+
+class FakePaginator:
+    """Pages through a sorted key list the way list_objects_v2 does, a few keys per page."""
+
+    def __init__(self, keys, page_size, fail_prefix=None):
+        self.keys = keys
+        self.page_size = page_size
+        self.fail_prefix = fail_prefix
+
+    def paginate(self, Bucket, Prefix="", Delimiter=None, StartAfter=None):
+        if self.fail_prefix is not None and StartAfter is not None and StartAfter >= self.fail_prefix:
+            raise RuntimeError("listing failed")
+        contents, prefixes = [], []
+        for key in self.keys:
+            if not key.startswith(Prefix) or (StartAfter is not None and key <= StartAfter):
+                continue
+            if Delimiter and Delimiter in key[len(Prefix):]:
+                common = key[:key.index(Delimiter, len(Prefix)) + 1]
+                if common not in prefixes:
+                    prefixes.append(common)
+            else:
+                contents.append({"Key": key})
+        for start in range(0, max(len(contents), 1), self.page_size):
+            page = {"Contents": contents[start:start + self.page_size]}
+            if start == 0:
+                page["CommonPrefixes"] = [{"Prefix": p} for p in prefixes]
+            yield page
+
+class FakeS3Client:
+    def __init__(self, keys=KEYS, page_size=3, fail_prefix=None):
+        self.paginator = FakePaginator(keys, page_size, fail_prefix)
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self.paginator
+
+def keys_of(objects):
+    return [obj["Key"] for obj in objects]
+
+def test_discover_split_keys_keeps_leaf_prefixes():
+    """Prefixes without sub-prefixes stay split points at the next depth."""
+    client = FakeS3Client()
+    assert discover_split_keys(client, "bucket") == ["a/", "b/", "c/", "d/", "f/"]
+    assert discover_split_keys(client, "bucket", depth=2) == ["a/b/", "b/c/", "c/x/", "c/y/", "d/", "f/"]
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_ordered_listing_matches_a_single_walk(depth):
+    """Ordered mode yields every key once, in the same order as one list_objects_v2 walk."""
+    objects = list_objects_parallel(FakeS3Client(), "bucket", depth=depth, max_workers=4, ordered=True, buffer_size=2)
+    assert keys_of(objects) == KEYS
+
+def test_ordered_listing_with_explicit_split_keys():
+    """Keys equal to a split key and keys just before it land in the right range."""
+    objects = list_objects_parallel(FakeS3Client(), "bucket", split_keys=["b", "b/", "c/y/1", "zzz"], ordered=True)
+    assert keys_of(objects) == KEYS
+
+def test_unordered_listing_yields_every_key_once():
+    objects = list_objects_parallel(FakeS3Client(), "bucket", max_workers=3, ordered=False, buffer_size=2)
+    assert sorted(keys_of(objects)) == KEYS
+
+def test_listing_under_a_prefix():
+    objects = list_objects_parallel(FakeS3Client(), "bucket", prefix="c/", ordered=True)
+    assert keys_of(objects) == ["c/x/1", "c/y/1", "c/y/2"]
+
+def test_closing_early_stops_the_listers():
+    """Abandoning the generator does not leave range listers blocked on full buffers."""
+    objects = list_objects_parallel(FakeS3Client(page_size=1), "bucket", max_workers=4, ordered=True, buffer_size=1)
+    assert next(objects)["Key"] == "a"
+    objects.close()
+
+def test_listing_errors_are_raised_to_the_consumer():
+    with pytest.raises(RuntimeError, match="listing failed"):
+        list(list_objects_parallel(FakeS3Client(fail_prefix="c"), "bucket", ordered=True))
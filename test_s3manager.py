@@ -0,0 +1,86 @@
+import importlib.machinery
+import importlib.util
+import os
+import sqlite3
+import pytest
+
+pytest.importorskip("pymysql")
+pytest.importorskip("boto3")
+
+# S3manager has no .py extension, so it is loaded from its path
+_loader = importlib.machinery.SourceFileLoader("S3manager", os.path.join(os.path.dirname(__file__), "S3manager"))
+S3manager = importlib.util.module_from_spec(importlib.util.spec_from_loader("S3manager", _loader))
+_loader.exec_module(S3manager)
+
+ROWS = [
+    (1, "b", "b1"), (2, "a", "a1"), (3, "c", "c1"), (4, "a", "a2"),
+    (5, "b", "b2"), (6, "a", "a3"), (7, "c", "c2"), (8, "a", "a4"),
+]
+
+@pytest.fixture
+def db(request):
+    """SQLiteDatabase over an in-memory table, shared by the pool's connections."""
+    uri = f"file:{request.node.name}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(uri, uri=True)
+    keeper.execute("CREATE TABLE your_table (id INTEGER PRIMARY KEY, name TEXT, file_key TEXT)")
+    keeper.executemany("INSERT INTO your_table VALUES (?, ?, ?)", ROWS)
+    keeper.commit()
+
+    database = S3manager.SQLiteDatabase(uri, pool_size=2)
+    database.connect()
+    yield database
+    database.close()
+    keeper.close()
+
+def test_iter_entries_pages_by_primary_key(db):
+    """Keyset pages return every entry of a name once, in primary key order."""
+    entries = list(db.iter_entries("a", batch_size=2))
+    assert [entry["file_key"] for entry in entries] == ["a1", "a2", "a3", "a4"]
+
+def test_iter_entries_for_names_orders_by_name_then_key(db):
+    """Entries of several names come out per chunk of names, ordered by (name, id)."""
+    db.max_names_per_query = 2
+    entries = list(db.iter_entries_for_names(["c", "a", "b"], batch_size=3))
+    assert [entry["file_key"] for entry in entries] == ["a1", "a2", "a3", "a4", "b1", "b2", "c1", "c2"]
+
+def test_get_counts(db):
+    """Names with no entries are counted as zero."""
+    db.max_names_per_query = 1
+    assert db.get_counts(["a", "b", "missing"]) == {"a": 4, "b": 2, "missing": 0}
+    assert db.get_count("c") == 2
+
+class FakeReferenceBucket:
+    """Stands in for S3Manager over the reference bucket, counting the objects read."""
+
+    bucket_name = "reference"
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.reads = []
+
+    def list_objects(self):
+        return [{"Key": key, "ETag": f'"{key}"'} for key in self.contents]
+
+    def iter_lines(self, key):
+        self.reads.append(key)
+        yield from self.contents[key]
+
+def test_bloom_reference_index_reads_each_object_once(tmp_path):
+    reference = FakeReferenceBucket({"r1": ["a", "b"], "r2": ["c"]})
+    path = str(tmp_path / "reference.bloom")
+
+    index = S3manager.ReferenceIndex.load_or_build(reference, path, use_bloom=True)
+
+    assert sorted(reference.reads) == ["r1", "r2"]
+    assert all(member in index for member in "abc")
+    assert os.listdir(tmp_path) == ["reference.bloom"]
+
+def test_exact_reference_index_reloads_members_with_carriage_returns(tmp_path):
+    reference = FakeReferenceBucket({"r1": ["a\rb", "c"]})
+    path = str(tmp_path / "reference.idx")
+    S3manager.ReferenceIndex.load_or_build(reference, path)
+
+    index = S3manager.ReferenceIndex.load_or_build(reference, path)
+
+    assert reference.reads == ["r1"]
+    assert index.members == {"a\rb", "c"}
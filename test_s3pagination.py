@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from s3pagination import diff_listings, objects_match
+
+def obj(key, size=1, etag='"a"', last_modified=0):
+    return {'Key': key, 'Size': size, 'ETag': etag, 'LastModified': last_modified}
+
+def test_objects_match():
+    """Size and ETag decide, except that multipart ETags fall back to modification time."""
+    assert objects_match(obj('k'), obj('k'))
+    assert not objects_match(obj('k', size=1), obj('k', size=2))
+    assert not objects_match(obj('k', etag='"a"'), obj('k', etag='"b"'))
+    assert objects_match(obj('k', etag='"a-2"', last_modified=1), obj('k', etag='"b"', last_modified=2))
+    assert not objects_match(obj('k', etag='"a-2"', last_modified=2), obj('k', etag='"b"', last_modified=1))
+
+def test_diff_listings_merge_joins_sorted_listings():
+    """New and changed source objects are copied; destination objects missing from the source are deleted."""
+    source = [obj('a'), obj('b', etag='"new"'), obj('c'), obj('e')]
+    dest = [obj('b', etag='"old"'), obj('c'), obj('d'), obj('f')]
+
+    assert [(action, o['Key']) for action, o in diff_listings(source, dest)] == [
+        ('copy', 'a'), ('copy', 'b'), ('delete', 'd'), ('copy', 'e'), ('delete', 'f')
+    ]
+
+def test_diff_listings_with_an_empty_side():
+    assert [(action, o['Key']) for action, o in diff_listings([obj('a'), obj('b')], [])] == [('copy', 'a'), ('copy', 'b')]
+    assert [(action, o['Key']) for action, o in diff_listings([], iter([obj('a')]))] == [('delete', 'a')]
@@ -0,0 +1,68 @@
+import pytest
+from sqs_ack_manager import SqsAckManager
+
+class FakeSqsClient:
+    """Records the batch calls made by SqsAckManager."""
+
+    def __init__(self):
+        self.calls = []
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.calls.append(("delete", Entries))
+        return {}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self.calls.append(("visibility", Entries))
+        return {}
+
+    def handles(self, kind):
+        return [[entry["ReceiptHandle"] for entry in entries] for call_kind, entries in self.calls if call_kind == kind]
+
+@pytest.fixture
+def client():
+    return FakeSqsClient()
+
+def test_acks_are_deleted_in_batches_of_ten(client):
+    """Acked messages are deleted ten per call, and every pending delete is flushed on close."""
+    manager = SqsAckManager(client, "queue", heartbeat_interval=3600)
+    for i in range(23):
+        manager.track(f"h{i}")
+        manager.ack(f"h{i}")
+    manager.start()
+    manager.close()
+
+    batches = client.handles("delete")
+    assert [len(batch) for batch in batches] == [10, 10, 3]
+    assert sum(batches, []) == [f"h{i}" for i in range(23)]
+
+def test_nack_backs_off_by_receive_count(client):
+    """A nacked message becomes visible after a backoff that doubles with each receive, up to the cap."""
+    manager = SqsAckManager(client, "queue", heartbeat_interval=3600, retry_backoff=30, max_retry_backoff=900)
+    for receipt_handle, receive_count in [("first", 1), ("third", 3), ("tenth", 10)]:
+        manager.track(receipt_handle, receive_count)
+        manager.nack(receipt_handle)
+    manager.start()
+    manager.close()
+
+    entries = [entry for kind, batch in client.calls if kind == "visibility" for entry in batch]
+    assert {entry["ReceiptHandle"]: entry["VisibilityTimeout"] for entry in entries} == {
+        "first": 30, "third": 120, "tenth": 900
+    }
+
+def test_heartbeat_extends_only_tracked_messages(client):
+    """Acked and nacked messages are no longer heartbeated; the rest are kept invisible."""
+    manager = SqsAckManager(client, "queue", flush_interval=0.01, visibility_timeout=60, heartbeat_interval=0)
+    for receipt_handle in ["running", "acked", "nacked"]:
+        manager.track(receipt_handle)
+    manager.ack("acked")
+    manager.nack("nacked")
+    manager.start()
+    manager.close()
+
+    heartbeats = [
+        batch for kind, batch in client.calls
+        if kind == "visibility" and batch[0]["VisibilityTimeout"] == 60
+    ]
+    assert heartbeats
+    assert all([entry["ReceiptHandle"] for entry in batch] == ["running"] for batch in heartbeats)
+    assert client.handles("delete") == [["acked"]]